@@ -0,0 +1,96 @@
+"""
+Allowlist of users who may use the bot
+Replaces the single OWNER_ID check; OWNER_ID becomes the first admin
+"""
+
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+import async_db as adb
+import database as db
+
+OWNER_ID = os.environ.get("OWNER_ID")
+# Extra users allowed from the environment, comma separated
+ALLOWED_USER_IDS = os.environ.get("ALLOWED_USER_IDS", "")
+
+# How long a worker trusts its copy of the allowlist
+ALLOWLIST_TTL = float(os.environ.get("ALLOWLIST_TTL_SECONDS", 30))
+
+
+class Allowlist:
+    """In-memory copy of the allowed_users table, refreshed in the background after a TTL"""
+    
+    def __init__(self, ttl: float):
+        self._ttl = ttl
+        self._users: Dict[int, bool] = {}
+        self._loaded_at = None
+        self._refreshing = False
+        self._lock = threading.Lock()
+    
+    def refresh(self):
+        """Reload the allowlist from the database"""
+        try:
+            users = db.get_allowed_users()
+            with self._lock:
+                self._users = users
+                self._loaded_at = time.monotonic()
+        finally:
+            self._refreshing = False
+    
+    def _current(self) -> Dict[int, bool]:
+        if self._loaded_at is None:
+            # Only before seed_allowlist() has run; workers inherit its copy
+            self.refresh()
+        elif time.monotonic() - self._loaded_at > self._ttl:
+            # Called on the bot loop, so reload on the database pool and keep
+            # serving the current copy until it lands
+            with self._lock:
+                start = not self._refreshing
+                self._refreshing = True
+            if start:
+                adb.submit(self.refresh)
+        return self._users
+    
+    def is_allowed(self, user_id: int) -> bool:
+        users = self._current()
+        # An empty allowlist keeps the bot open, like running without OWNER_ID
+        return not users or user_id in users
+    
+    def is_admin(self, user_id: int) -> bool:
+        return self._current().get(user_id, False)
+
+
+allowlist = Allowlist(ALLOWLIST_TTL)
+
+
+def seed_allowlist():
+    """Make sure OWNER_ID and ALLOWED_USER_IDS are on the allowlist"""
+    if OWNER_ID:
+        db.allow_user(int(OWNER_ID), is_admin=True)
+    
+    for user_id in ALLOWED_USER_IDS.split(","):
+        if user_id.strip():
+            db.allow_user(int(user_id.strip()))
+    
+    allowlist.refresh()
+
+
+def sender_id(data: dict) -> Optional[int]:
+    """Sender of a raw webhook update, without building an Update object"""
+    # Every update carries exactly one payload object next to update_id
+    for value in data.values():
+        if isinstance(value, dict):
+            sender = value.get("from") or value.get("user")
+            if isinstance(sender, dict):
+                return sender.get("id")
+    return None
+
+
+def is_allowed(user_id: int) -> bool:
+    return allowlist.is_allowed(user_id)
+
+
+def is_admin(user_id: int) -> bool:
+    return allowlist.is_admin(user_id)
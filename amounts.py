@@ -0,0 +1,90 @@
+"""
+Money amount parsing and formatting shared by every command that takes an amount
+Amounts are whole rupiah; input may use Indonesian or English notation, suffixes and sums
+"""
+
+import re
+from decimal import ROUND_HALF_UP, Decimal
+from functools import lru_cache
+
+# Largest single amount (Rp 1 triliun) and largest savings balance. Both stay far
+# below SQLite's 64-bit INTEGER, which would otherwise overflow or turn into REAL
+MAX_AMOUNT = 10 ** 12
+MAX_BALANCE = 10 ** 18
+
+# One term of an amount expression, e.g. "Rp 1.500.000", "2,5jt", "10k"
+TERM = re.compile(r"(?:rp\.?\s*)?(\d+(?:[.,]\d+)*)\s*(k|rb|ribu|jt|juta)?")
+
+SUFFIXES = {
+    None: Decimal(1),
+    "k": Decimal(1000),
+    "rb": Decimal(1000),
+    "ribu": Decimal(1000),
+    "jt": Decimal(1000000),
+    "juta": Decimal(1000000),
+}
+
+
+class AmountTooLarge(ValueError):
+    """An amount or resulting balance above MAX_AMOUNT / MAX_BALANCE"""
+
+
+def _number(text: str) -> Decimal:
+    """Read a number written with either '.' or ',' as the decimal mark"""
+    dots, commas = text.count("."), text.count(",")
+    
+    if dots and commas:
+        # Both present: whichever comes last is the decimal mark
+        decimal_mark = "." if text.rfind(".") > text.rfind(",") else ","
+    elif dots + commas == 1:
+        # A single separator before exactly three digits groups thousands,
+        # as in "1.500" or "1,500"; otherwise it's a decimal, as in "2,5"
+        separator = "." if dots else ","
+        decimal_mark = None if len(text) - text.index(separator) == 4 else separator
+    else:
+        # Repeated separators can only be thousands groups
+        decimal_mark = None
+    
+    if decimal_mark is None:
+        integer, fraction = text, ""
+    else:
+        integer, _, fraction = text.rpartition(decimal_mark)
+    
+    # Every group after a thousands mark must be exactly three digits
+    groups = re.split(r"[.,]", integer)
+    if any(len(group) != 3 for group in groups[1:]):
+        raise ValueError(f"Invalid number: {text}")
+    
+    return Decimal("".join(groups) + ("." + fraction if fraction else ""))
+
+
+def _term(text: str) -> Decimal:
+    """Parse one term of a sum, with its optional prefix and suffix"""
+    match = TERM.fullmatch(text.strip())
+    if match is None:
+        raise ValueError(f"Invalid amount: {text}")
+    
+    number, suffix = match.groups()
+    return _number(number) * SUFFIXES[suffix]
+
+
+@lru_cache(maxsize=1024)
+def parse_amount(text: str) -> int:
+    """Parse an amount like '10k', '1.5jt', 'Rp 25.000' or '10k+5k' into whole rupiah"""
+    text = text.lower().strip()
+    
+    # Fast path for the common plain integer
+    if text.isdigit():
+        amount = int(text)
+    else:
+        total = sum(_term(term) for term in text.split("+"))
+        amount = int(total.quantize(Decimal(1), rounding=ROUND_HALF_UP))
+    
+    if amount > MAX_AMOUNT:
+        raise AmountTooLarge(f"Amount above {MAX_AMOUNT}: {text}")
+    return amount
+
+
+def rupiah(amount: int) -> str:
+    """Format whole rupiah for display, e.g. 'Rp 1,500,000'"""
+    return f"Rp {amount:,}"
@@ -3,13 +3,24 @@ Telegram Personal Assistant Bot - Webhook Version
 For HuggingFace Spaces deployment
 """
 
+import time
+
+# Cold start is measured from here; gunicorn workers inherit it from the master
+STARTED_AT = time.perf_counter()
+
 import os
+import hmac
+import json
+import hashlib
 import logging
 import asyncio
-from flask import Flask, request
-from telegram import Update, BotCommand
+import threading
+from typing import Optional
+from flask import Flask, Response, request
+from telegram import Bot, Update, BotCommand
 from telegram.ext import (
     Application,
+    CallbackQueryHandler,
     CommandHandler,
     ContextTypes,
     MessageHandler,
@@ -17,9 +28,15 @@ from telegram.ext import (
 )
 
 import database as db
-from savings import handle_tabung, handle_ambil, handle_saldo
-from expenses import handle_keluar, handle_laporan, handle_laporan_bulan
-from notes import handle_note, handle_notes, handle_lihat, handle_hapus_note, handle_edit
+import async_db as adb
+from access import is_allowed, is_admin, seed_allowlist, sender_id
+from metrics import (
+    Gauge, InstrumentedRequest, STARTUP_SECONDS, WEBHOOK_IN_FLIGHT, WEBHOOK_REJECTED, registry, track_command,
+)
+from outbox import outbox, reply
+from features import CALLBACKS, DOCUMENTS, FEATURES, lazy
+from update_queue import UpdateQueue
+from dedup import RecentUpdates
 
 # Logging
 logging.basicConfig(
@@ -30,8 +47,29 @@ logger = logging.getLogger(__name__)
 
 # Environment
 BOT_TOKEN = os.environ.get("BOT_TOKEN")
-OWNER_ID = os.environ.get("OWNER_ID")
 SPACE_HOST = os.environ.get("SPACE_HOST", "")
+# Point at a local Bot API (e.g. tools/fake_bot_api.py) for load testing
+BOT_API_BASE_URL = os.environ.get("BOT_API_BASE_URL", "")
+
+# Telegram echoes this back in X-Telegram-Bot-Api-Secret-Token on every webhook call;
+# derived from the token when not set so every worker agrees on it
+WEBHOOK_SECRET = os.environ.get("WEBHOOK_SECRET") or (
+    hashlib.sha256(BOT_TOKEN.encode()).hexdigest() if BOT_TOKEN else ""
+)
+
+# Keep-alive connection pool to the Bot API, shared by all outgoing calls
+BOT_API_POOL_SIZE = int(os.environ.get("BOT_API_POOL_SIZE", 32))
+BOT_API_POOL_TIMEOUT = float(os.environ.get("BOT_API_POOL_TIMEOUT", 5))
+
+# Acknowledge webhook calls before processing, from a bounded queue (opt-in)
+WEBHOOK_QUEUE = os.environ.get("WEBHOOK_QUEUE", "0") == "1"
+WEBHOOK_QUEUE_SIZE = int(os.environ.get("WEBHOOK_QUEUE_SIZE", 1000))
+WEBHOOK_QUEUE_WORKERS = int(os.environ.get("WEBHOOK_QUEUE_WORKERS", 16))
+
+# Recently received update_ids remembered per worker, to drop webhook retries cheaply
+UPDATE_DEDUP_SIZE = int(os.environ.get("UPDATE_DEDUP_SIZE", 10000))
+# How often old processed update_ids are pruned from the database
+PRUNE_INTERVAL = 60 * 60
 
 # Flask app
 app = Flask(__name__)
@@ -39,26 +77,68 @@ app = Flask(__name__)
 # Telegram application (global)
 application = None
 
+# Long-lived event loop that owns the application (global)
+bot_loop = None
+
+# Queue of acknowledged updates when WEBHOOK_QUEUE is on (global)
+update_queue = None
+
+# Background pruning of processed update_ids (global)
+prune_task = None
+
+recent_updates = RecentUpdates(UPDATE_DEDUP_SIZE)
+
+registry.register(Gauge(
+    "webhook_queue_depth", "Acknowledged updates not yet processed",
+    lambda: update_queue.pending() if update_queue is not None else 0,
+))
+
 
-def is_owner(user_id: int) -> bool:
-    if not OWNER_ID:
-        return True
-    return str(user_id) == str(OWNER_ID)
+def start_bot_loop() -> asyncio.AbstractEventLoop:
+    """Start the bot event loop in a background thread"""
+    global bot_loop
+    
+    if bot_loop is None:
+        bot_loop = asyncio.new_event_loop()
+        thread = threading.Thread(target=bot_loop.run_forever, name="bot-loop", daemon=True)
+        thread.start()
+    
+    return bot_loop
+
+
+def run_on_bot_loop(coro):
+    """Run a coroutine on the bot loop from any thread and wait for the result"""
+    return asyncio.run_coroutine_threadsafe(coro, bot_loop).result()
+
+
+async def deny(update: Update):
+    if update.callback_query:
+        await update.callback_query.answer("Akses ditolak.")
+    else:
+        reply(update, "Akses ditolak.")
 
 
-async def owner_only(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    if not is_owner(update.effective_user.id):
-        await update.message.reply_text("Akses ditolak.")
+async def allowed_only(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    # Strangers are normally dropped in webhook(); stay silent here too
+    # so a revoked user can't make us spend API calls
+    return is_allowed(update.effective_user.id)
+
+
+async def admin_only(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not is_admin(update.effective_user.id):
+        await deny(update)
         return False
     return True
 
 
 # Command handlers
+@track_command("start")
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    if not await owner_only(update, context):
+    if not await allowed_only(update, context):
         return
     user = update.effective_user
-    await update.message.reply_text(
+    reply(
+        update,
         f"Halo {user.first_name}!\n\n"
         "Aku asisten pribadi kamu untuk:\n"
         "- Menabung\n"
@@ -68,76 +148,59 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     )
 
 
+@track_command("help")
 async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    if not await owner_only(update, context):
+    if not await allowed_only(update, context):
         return
-    await update.message.reply_text(
+    reply(
+        update,
         "TABUNGAN\n"
         "/tabung 50k - nabung\n"
         "/ambil 25k - ambil\n"
-        "/saldo - cek saldo\n\n"
+        "/saldo - cek saldo\n"
+        "/rekonsiliasi - cocokkan saldo\n\n"
         "PENGELUARAN\n"
         "/keluar 10k jajan - catat\n"
         "/laporan - minggu ini\n"
-        "/laporan_bulan - bulan ini\n\n"
+        "/laporan 01/10/2026 31/10/2026 - rentang tanggal\n"
+        "/laporan_bulan - bulan ini\n"
+        "/laporan_bulan 2026-09 - bulan tertentu\n"
+        "/import - impor CSV pengeluaran & tabungan\n"
+        "/export pengeluaran 2026-10 - ekspor data\n\n"
         "CATATAN\n"
         "/note gmail pass123 - simpan\n"
         "/edit gmail newpass - ubah\n"
         "/notes - lihat semua\n"
         "/lihat gmail - buka\n"
+        "/cari email - cari di judul & isi\n"
         "/hapus_note gmail - hapus\n\n"
-        "Tips: 10k = 10.000, 1jt = 1.000.000"
+        "PENGATURAN\n"
+        "/zona WITA - atur zona waktu\n\n"
+        "PENGGUNA (admin)\n"
+        "/izinkan 12345 - beri akses\n"
+        "/cabut 12345 - cabut akses\n"
+        "/pengguna - daftar pengguna\n\n"
+        "Tips: 10k = 10.000, 1,5jt = 1.500.000, 10k+5k = 15.000"
     )
 
 
 # Wrapper handlers
-async def tabung_wrapper(update, context):
-    if not await owner_only(update, context): return
-    await handle_tabung(update, context)
-
-async def ambil_wrapper(update, context):
-    if not await owner_only(update, context): return
-    await handle_ambil(update, context)
-
-async def saldo_wrapper(update, context):
-    if not await owner_only(update, context): return
-    await handle_saldo(update, context)
-
-async def keluar_wrapper(update, context):
-    if not await owner_only(update, context): return
-    await handle_keluar(update, context)
-
-async def laporan_wrapper(update, context):
-    if not await owner_only(update, context): return
-    await handle_laporan(update, context)
-
-async def laporan_bulan_wrapper(update, context):
-    if not await owner_only(update, context): return
-    await handle_laporan_bulan(update, context)
-
-async def note_wrapper(update, context):
-    if not await owner_only(update, context): return
-    await handle_note(update, context)
-
-async def edit_wrapper(update, context):
-    if not await owner_only(update, context): return
-    await handle_edit(update, context)
-
-async def notes_wrapper(update, context):
-    if not await owner_only(update, context): return
-    await handle_notes(update, context)
-
-async def lihat_wrapper(update, context):
-    if not await owner_only(update, context): return
-    await handle_lihat(update, context)
+def guarded(name: str, handler, admin: bool = False):
+    """Wrap a feature handler with its access check and latency metric"""
+    check = admin_only if admin else allowed_only
+    
+    @track_command(name)
+    async def wrapper(update, context):
+        if not await check(update, context): return
+        await handler(update, context)
+    
+    return wrapper
 
-async def hapus_note_wrapper(update, context):
-    if not await owner_only(update, context): return
-    await handle_hapus_note(update, context)
 
+@track_command("unknown")
 async def unknown(update, context):
-    if not await owner_only(update, context): return
-    await update.message.reply_text("Command tidak dikenal. Ketik /help")
+    if not await allowed_only(update, context): return
+    reply(update, "Command tidak dikenal. Ketik /help")
 
 
 # Flask routes
@@ -157,91 +220,262 @@ def webhook():
     if application is None:
         return "Bot not initialized", 500
     
-    update = Update.de_json(request.get_json(force=True), application.bot)
+    secret = request.headers.get("X-Telegram-Bot-Api-Secret-Token", "")
+    if not hmac.compare_digest(secret.encode(), WEBHOOK_SECRET.encode()):
+        WEBHOOK_REJECTED.inc("secret")
+        return "Forbidden", 403
     
-    # Process update asynchronously
-    asyncio.run(application.process_update(update))
+    data = request.get_json(force=True)
+    update_id = data.get("update_id")
+    if update_id is not None and recent_updates.seen(update_id):
+        WEBHOOK_REJECTED.inc("duplicate")
+        return "OK"
+    
+    # Drop strangers before building any objects or touching the database;
+    # answer 200 so Telegram doesn't retry
+    user_id = sender_id(data)
+    if user_id is None or not is_allowed(user_id):
+        WEBHOOK_REJECTED.inc("sender")
+        return "OK"
+    
+    update = Update.de_json(data, application.bot)
+    
+    if update_queue is not None:
+        chat_id = update.effective_chat.id if update.effective_chat else user_id
+        if not update_queue.submit(chat_id, update):
+            # Telegram retries non-2xx answers later; that retry must not
+            # look like a duplicate
+            if update_id is not None:
+                recent_updates.forget(update_id)
+            if update_queue.closed:
+                WEBHOOK_REJECTED.inc("shutdown")
+                return "Shutting down", 503
+            WEBHOOK_REJECTED.inc("queue_full")
+            return "Too many updates", 429, {"Retry-After": "1"}
+        return "OK"
+    
+    # Hand the update to the long-lived bot loop so the HTTP connection
+    # pool to the Bot API is reused across updates
+    WEBHOOK_IN_FLIGHT.inc()
+    try:
+        run_on_bot_loop(application.process_update(update))
+    except Exception:
+        # Flask answers 500 and Telegram retries
+        if update_id is not None:
+            recent_updates.forget(update_id)
+        raise
+    finally:
+        WEBHOOK_IN_FLIGHT.dec()
     
     return "OK"
 
 
+@app.route("/metrics")
+def metrics():
+    """Prometheus metrics, merged across workers when METRICS_DIR is set"""
+    return Response(registry.render(), mimetype="text/plain; version=0.0.4")
+
+
+# Bot command menu
+COMMANDS = [
+    BotCommand("start", "Mulai bot"),
+    BotCommand("help", "Bantuan"),
+] + [BotCommand(feature.command, feature.description) for feature in FEATURES]
+
+
+def get_webhook_url() -> Optional[str]:
+    """Public webhook URL of this deployment"""
+    if SPACE_HOST:
+        return f"https://{SPACE_HOST}/webhook"
+    
+    # For HuggingFace, construct URL from space name
+    space_name = os.environ.get("SPACE_ID", "")
+    if space_name:
+        return f"https://{space_name.replace('/', '-')}.hf.space/webhook"
+    
+    return None
+
+
+def build_application() -> Application:
+    """Create the Telegram application with all handlers"""
+    # Instrumented request records latency and errors of every Bot API call
+    bot_request = InstrumentedRequest(
+        connection_pool_size=BOT_API_POOL_SIZE,
+        pool_timeout=BOT_API_POOL_TIMEOUT,
+        connect_timeout=5,
+        read_timeout=10,
+        write_timeout=10,
+    )
+    builder = Application.builder().token(BOT_TOKEN).request(bot_request)
+    if BOT_API_BASE_URL:
+        builder = builder.base_url(f"{BOT_API_BASE_URL}/bot").base_file_url(f"{BOT_API_BASE_URL}/file/bot")
+    application = builder.build()
+    
+    # Add handlers
+    application.add_handler(CommandHandler("start", start))
+    application.add_handler(CommandHandler("help", help_command))
+    for feature in FEATURES:
+        handler = guarded(feature.command, lazy(feature.handler), feature.admin)
+        application.add_handler(CommandHandler(feature.command, handler))
+    for callback in CALLBACKS:
+        handler = guarded(callback.name, lazy(callback.handler))
+        application.add_handler(CallbackQueryHandler(handler, pattern=callback.pattern))
+    for document in DOCUMENTS:
+        handler = guarded(document.name, lazy(document.handler))
+        application.add_handler(MessageHandler(filters.Document.ALL & filters.CaptionRegex(document.pattern), handler))
+    application.add_handler(MessageHandler(filters.COMMAND, unknown))
+    
+    return application
+
+
+def config_hash(*parts) -> str:
+    """Stable hash of the configuration last sent to the Bot API"""
+    return hashlib.sha256(json.dumps(parts, sort_keys=True).encode()).hexdigest()
+
+
+async def register_bot(bot: Bot):
+    """Set the command menu and webhook (once per deployment, not per worker)"""
+    # Only startup runs this, so the quick meta lookups can stay synchronous
+    commands_hash = config_hash([command.to_dict() for command in COMMANDS])
+    if db.get_meta("commands_hash") != commands_hash:
+        await bot.set_my_commands(COMMANDS)
+        db.set_meta("commands_hash", commands_hash)
+    else:
+        logger.info("Command menu unchanged, skipping setMyCommands")
+    
+    webhook_url = get_webhook_url()
+    if not webhook_url:
+        logger.warning("Could not set webhook - SPACE_HOST or SPACE_ID not found")
+        return
+    
+    webhook_hash = config_hash(webhook_url, WEBHOOK_SECRET)
+    stored_hash = db.get_meta("webhook_hash")
+    if stored_hash == webhook_hash:
+        logger.info("Webhook unchanged, skipping setWebhook")
+        return
+    
+    # With no stored hash we can't know which secret the existing webhook
+    # carries (getWebhookInfo doesn't say), so always register it
+    await bot.set_webhook(url=webhook_url, secret_token=WEBHOOK_SECRET)
+    db.set_meta("webhook_hash", webhook_hash)
+    logger.info(f"Webhook set to: {webhook_url}")
+
+
+async def prune_processed_updates():
+    """Forget old processed update_ids once an hour"""
+    while True:
+        await asyncio.sleep(PRUNE_INTERVAL)
+        try:
+            removed = await adb.prune_processed_updates()
+            logger.info(f"Pruned {removed} processed updates")
+        except Exception:
+            logger.exception("Failed to prune processed updates")
+
+
+async def start_application():
+    """Create and initialize this process's application"""
+    global application, update_queue, prune_task
+    
+    application = build_application()
+    await application.initialize()
+    outbox.start(application.bot)
+    
+    if WEBHOOK_QUEUE:
+        update_queue = UpdateQueue(application.process_update, WEBHOOK_QUEUE_WORKERS, WEBHOOK_QUEUE_SIZE)
+        await update_queue.start()
+    
+    prune_task = asyncio.create_task(prune_processed_updates())
+    
+    return application
+
+
+def record_startup():
+    """Report how long this process took to become ready"""
+    elapsed = time.perf_counter() - STARTED_AT
+    STARTUP_SECONDS.set(elapsed)
+    logger.info(f"Ready in {elapsed:.2f}s")
+
+
 async def setup_bot():
     """Initialize bot and set webhook"""
-    global application
-    
     if not BOT_TOKEN:
         logger.error("BOT_TOKEN not set!")
         return None
     
     # Initialize database
+    await adb.run(db.init_database)
+    logger.info(f"Database initialized (schema version {db.get_schema_version()})")
+    
+    await adb.run(seed_allowlist)
+    
+    await start_application()
+    await register_bot(application.bot)
+    record_startup()
+    
+    return application
+
+
+def bootstrap():
+    """One-time deployment setup, run by the gunicorn master before forking"""
+    if not BOT_TOKEN:
+        logger.error("BOT_TOKEN not set!")
+        return
+    
     db.init_database()
-    logger.info("Database initialized")
+    logger.info(f"Database initialized (schema version {db.get_schema_version()})")
+    seed_allowlist()
+    db.prune_processed_updates()
     
-    # Create application
-    application = Application.builder().token(BOT_TOKEN).build()
+    async def register():
+        async with build_application().bot as bot:
+            await register_bot(bot)
     
-    # Add handlers
-    application.add_handler(CommandHandler("start", start))
-    application.add_handler(CommandHandler("help", help_command))
-    application.add_handler(CommandHandler("tabung", tabung_wrapper))
-    application.add_handler(CommandHandler("ambil", ambil_wrapper))
-    application.add_handler(CommandHandler("saldo", saldo_wrapper))
-    application.add_handler(CommandHandler("keluar", keluar_wrapper))
-    application.add_handler(CommandHandler("laporan", laporan_wrapper))
-    application.add_handler(CommandHandler("laporan_bulan", laporan_bulan_wrapper))
-    application.add_handler(CommandHandler("note", note_wrapper))
-    application.add_handler(CommandHandler("edit", edit_wrapper))
-    application.add_handler(CommandHandler("notes", notes_wrapper))
-    application.add_handler(CommandHandler("lihat", lihat_wrapper))
-    application.add_handler(CommandHandler("hapus_note", hapus_note_wrapper))
-    application.add_handler(MessageHandler(filters.COMMAND, unknown))
+    asyncio.run(register())
     
-    # Initialize
-    await application.initialize()
+    # SQLite connections must not be inherited across fork
+    db.close_connection()
+
+
+def start_worker():
+    """Start this worker's bot loop and application, run after fork"""
+    if not BOT_TOKEN:
+        logger.error("BOT_TOKEN not set!")
+        return
     
-    # Set commands
-    commands = [
-        BotCommand("start", "Mulai bot"),
-        BotCommand("help", "Bantuan"),
-        BotCommand("tabung", "Menabung"),
-        BotCommand("ambil", "Ambil tabungan"),
-        BotCommand("saldo", "Cek saldo"),
-        BotCommand("keluar", "Catat pengeluaran"),
-        BotCommand("laporan", "Laporan minggu ini"),
-        BotCommand("laporan_bulan", "Laporan bulan ini"),
-        BotCommand("note", "Simpan catatan"),
-        BotCommand("edit", "Ubah catatan"),
-        BotCommand("notes", "Daftar catatan"),
-        BotCommand("lihat", "Lihat catatan"),
-        BotCommand("hapus_note", "Hapus catatan"),
-    ]
-    await application.bot.set_my_commands(commands)
-    
-    # Set webhook
-    if SPACE_HOST:
-        webhook_url = f"https://{SPACE_HOST}/webhook"
-    else:
-        # For HuggingFace, construct URL from space name
-        space_name = os.environ.get("SPACE_ID", "")
-        if space_name:
-            webhook_url = f"https://{space_name.replace('/', '-')}.hf.space/webhook"
-        else:
-            webhook_url = None
-    
-    if webhook_url:
-        await application.bot.set_webhook(url=webhook_url)
-        logger.info(f"Webhook set to: {webhook_url}")
-    else:
-        logger.warning("Could not set webhook - SPACE_HOST or SPACE_ID not found")
+    start_bot_loop()
+    run_on_bot_loop(start_application())
+    record_startup()
+    registry.start_flusher()
+
+
+def stop_worker():
+    """Shut down this worker's application and database threads"""
+    if prune_task is not None:
+        bot_loop.call_soon_threadsafe(prune_task.cancel)
     
-    return application
+    if application is not None:
+        # Finish acknowledged updates first, they may still queue replies
+        if update_queue is not None:
+            run_on_bot_loop(update_queue.drain())
+        run_on_bot_loop(outbox.drain())
+        run_on_bot_loop(application.shutdown())
+    
+    adb.shutdown()
+    registry.stop_flusher()
+    
+    if bot_loop is not None:
+        bot_loop.call_soon_threadsafe(bot_loop.stop)
 
 
 if __name__ == "__main__":
-    # Setup bot
-    asyncio.run(setup_bot())
+    # Setup bot on the long-lived loop
+    start_bot_loop()
+    run_on_bot_loop(setup_bot())
     
     # Run Flask
     port = int(os.environ.get("PORT", 7860))
     logger.info(f"Starting Flask on port {port}")
-    app.run(host="0.0.0.0", port=port)
+    try:
+        app.run(host="0.0.0.0", port=port, threaded=True)
+    finally:
+        stop_worker()
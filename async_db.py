@@ -0,0 +1,95 @@
+"""
+Async facade over database.py for the bot handlers
+Queries run on a bounded thread pool so they never block the event loop
+"""
+
+import asyncio
+import functools
+import os
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import database as db
+
+# Each pool thread keeps its own long-lived connection
+DB_WORKERS = int(os.environ.get("DB_WORKERS", 4))
+
+_executor = ThreadPoolExecutor(max_workers=DB_WORKERS, thread_name_prefix="db")
+
+
+async def run(func, *args, **kwargs):
+    """Run a blocking database call on the database thread pool"""
+    loop = asyncio.get_running_loop()
+    # database.py functions time themselves, so queueing for a free thread isn't counted
+    return await loop.run_in_executor(_executor, functools.partial(func, *args, **kwargs))
+
+
+def submit(func, *args, **kwargs) -> Future:
+    """Start a blocking database call on the pool without waiting for it"""
+    return _executor.submit(func, *args, **kwargs)
+
+
+def _wrap(func):
+    """Turn a database.py function into an awaitable one"""
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        return await run(func, *args, **kwargs)
+    return wrapper
+
+
+def _wrap_write(func):
+    """Like _wrap, but hands the write straight to the group commit writer when enabled"""
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        if db.GROUP_COMMIT:
+            # Awaiting the writer's future doesn't hold a pool thread, so
+            # every in-flight update can join the same batch
+            return await asyncio.wrap_future(db.submit_write(func, *args, **kwargs))
+        return await run(func, *args, **kwargs)
+    return wrapper
+
+
+def shutdown():
+    """Wait for pending queries and stop the thread pool"""
+    _executor.shutdown(wait=True)
+    db.close_writer()
+
+
+# ==================== USERS ====================
+
+allow_user = _wrap(db.allow_user)
+revoke_user = _wrap(db.revoke_user)
+get_allowed_users = _wrap(db.get_allowed_users)
+
+# ==================== UPDATES ====================
+
+prune_processed_updates = _wrap(db.prune_processed_updates)
+
+# ==================== SETTINGS ====================
+
+get_user_timezone = _wrap(db.get_user_timezone)
+set_user_timezone = _wrap(db.set_user_timezone)
+
+# ==================== SAVINGS ====================
+
+add_savings = _wrap_write(db.add_savings)
+withdraw_savings = _wrap_write(db.withdraw_savings)
+get_savings_balance = _wrap(db.get_savings_balance)
+reconcile_savings_balance = _wrap(db.reconcile_savings_balance)
+get_savings_history = _wrap(db.get_savings_history)
+
+# ==================== EXPENSES ====================
+
+add_expense = _wrap_write(db.add_expense)
+rebuild_expense_rollup = _wrap(db.rebuild_expense_rollup)
+get_expenses_by_period = _wrap(db.get_expenses_by_period)
+get_total_expenses_by_period = _wrap(db.get_total_expenses_by_period)
+get_expense_report = _wrap(db.get_expense_report)
+
+# ==================== NOTES ====================
+
+save_note = _wrap(db.save_note)
+get_all_notes = _wrap(db.get_all_notes)
+get_note_by_title = _wrap(db.get_note_by_title)
+delete_note = _wrap(db.delete_note)
+search_notes = _wrap(db.search_notes)
+suggest_note_titles = _wrap(db.suggest_note_titles)
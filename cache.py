@@ -0,0 +1,70 @@
+"""
+Bounded LRU/TTL cache for rarely changing reads
+Writers invalidate it directly; a version counter stored with the data
+lets other processes notice changes they didn't make
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Hashable
+
+from metrics import CACHE_REQUESTS
+
+
+class LRUCache:
+    """Thread-safe LRU cache whose keys start with the owning user_id"""
+    
+    def __init__(self, name: str, max_size: int, ttl: float):
+        self._name = name
+        self._max_size = max_size
+        self._ttl = ttl
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Bumped on every invalidation, so a load that raced a write isn't stored
+        self._generation = 0
+        self._version = None
+    
+    def get_or_load(self, key: tuple, load: Callable):
+        """Cached value for key, calling load() on a miss or expiry"""
+        now = time.monotonic()
+        
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                CACHE_REQUESTS.inc(self._name, "hit")
+                return entry[1]
+            CACHE_REQUESTS.inc(self._name, "miss")
+            generation = self._generation
+        
+        value = load()
+        
+        with self._lock:
+            if generation == self._generation:
+                self._entries[key] = (now + self._ttl, value)
+                self._entries.move_to_end(key)
+                if len(self._entries) > self._max_size:
+                    self._entries.popitem(last=False)
+        
+        return value
+    
+    def invalidate(self, user_id: int, version: int):
+        """Drop a user's entries after a write that moved the version to version"""
+        with self._lock:
+            self._generation += 1
+            if self._version is not None and version == self._version + 1:
+                for key in [key for key in self._entries if key[0] == user_id]:
+                    del self._entries[key]
+            else:
+                # Someone else wrote in between; we can't tell whose entries are stale
+                self._entries.clear()
+            self._version = version
+    
+    def observe_version(self, version: int):
+        """Drop everything if the stored version moved without us"""
+        with self._lock:
+            if version != self._version:
+                self._generation += 1
+                self._entries.clear()
+                self._version = version
@@ -4,27 +4,183 @@ Uses SQLite for data persistence
 """
 
 import sqlite3
+import logging
 import os
+import threading
+from concurrent.futures import Future
+from contextlib import contextmanager
 from datetime import datetime
-from typing import List, Tuple, Optional
+import itertools
+from typing import Callable, Iterable, Iterator, List, Tuple, Optional
+
+from amounts import MAX_BALANCE, AmountTooLarge, rupiah
+from cache import LRUCache
+from group_commit import GroupCommitWriter
+from metrics import track_query
+from timezones import DEFAULT_TIMEZONE, local_day, now_epoch, to_epoch
+
+logger = logging.getLogger(__name__)
 
 DATABASE_PATH = os.environ.get("DATABASE_PATH", "bot_data.db")
 
+# Rows written before multi-user support belong to this user
+LEGACY_USER_ID = int(os.environ.get("LEGACY_USER_ID") or os.environ.get("OWNER_ID") or 0)
+
+# Connection tuning
+BUSY_TIMEOUT_MS = int(os.environ.get("DB_BUSY_TIMEOUT_MS", 5000))
+CACHE_SIZE_KB = int(os.environ.get("DB_CACHE_SIZE_KB", 8192))
+MMAP_SIZE = int(os.environ.get("DB_MMAP_SIZE", 64 * 1024 * 1024))
+
+# Opt-in group commit of expense/savings writes
+GROUP_COMMIT = os.environ.get("DB_GROUP_COMMIT", "") == "1"
+
+# In WAL mode NORMAL skips the fsync on commit. Group commit exists to share
+# that fsync across a batch, and only FULL makes its acknowledgement survive
+# a power loss, so it defaults to FULL
+SYNCHRONOUS = os.environ.get("DB_SYNCHRONOUS") or ("FULL" if GROUP_COMMIT else "NORMAL")
+GROUP_COMMIT_WINDOW_MS = float(os.environ.get("DB_GROUP_COMMIT_WINDOW_MS", 5))
+GROUP_COMMIT_MAX_BATCH = int(os.environ.get("DB_GROUP_COMMIT_MAX_BATCH", 256))
+
+# How long processed update_ids are remembered; Telegram stops retrying well within a day
+PROCESSED_UPDATE_TTL = int(os.environ.get("PROCESSED_UPDATE_TTL_SECONDS", 24 * 60 * 60))
+
+
+class DuplicateUpdate(Exception):
+    """The write was already applied for this Telegram update_id"""
+
+
+# Reply for writes that gave up waiting for the write lock (DB_BUSY_TIMEOUT_MS)
+BUSY_MESSAGE = "Database sedang sibuk, data belum tersimpan. Silakan coba lagi."
+
+# One long-lived connection per thread
+_local = threading.local()
+
+# Group commit writer thread, started on first use
+_writer = None
+_writer_lock = threading.Lock()
+
 
-def get_connection():
-    """Get database connection"""
-    conn = sqlite3.connect(DATABASE_PATH)
-    conn.row_factory = sqlite3.Row
+def _configure_connection(conn: sqlite3.Connection):
+    """Apply per-connection PRAGMAs"""
+    conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+    conn.execute(f"PRAGMA synchronous = {SYNCHRONOUS}")
+    conn.execute(f"PRAGMA cache_size = -{CACHE_SIZE_KB}")
+    conn.execute(f"PRAGMA mmap_size = {MMAP_SIZE}")
+    conn.execute("PRAGMA temp_store = MEMORY")
+    # Calendar day of an epoch timestamp in a zone, for rollup rebuilds
+    conn.create_function("local_day", 2, local_day, deterministic=True)
+
+
+def get_connection() -> sqlite3.Connection:
+    """Get the database connection for the current thread"""
+    conn = getattr(_local, "conn", None)
+    
+    if conn is None:
+        # Autocommit mode, transactions are opened explicitly by transaction()
+        conn = sqlite3.connect(DATABASE_PATH, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        _configure_connection(conn)
+        _local.conn = conn
+    
     return conn
 
 
-def init_database():
-    """Initialize database tables"""
+def close_connection():
+    """Close the database connection of the current thread"""
+    conn = getattr(_local, "conn", None)
+    
+    if conn is not None:
+        conn.close()
+        _local.conn = None
+
+
+@contextmanager
+def transaction():
+    """Run the enclosed statements in a single write transaction"""
     conn = get_connection()
-    cursor = conn.cursor()
     
+    if conn.in_transaction:
+        # Nested use becomes a savepoint inside the enclosing transaction
+        conn.execute("SAVEPOINT nested")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK TO nested")
+            conn.execute("RELEASE nested")
+            raise
+        else:
+            conn.execute("RELEASE nested")
+        return
+    
+    conn.execute("BEGIN IMMEDIATE")
+    
+    try:
+        yield conn
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    else:
+        conn.execute("COMMIT")
+
+
+def _get_writer() -> GroupCommitWriter:
+    """Get the group commit writer, starting it on first use"""
+    global _writer
+    
+    with _writer_lock:
+        if _writer is None:
+            if SYNCHRONOUS.upper() not in ("FULL", "EXTRA", "2", "3"):
+                logger.warning(
+                    "Group commit with DB_SYNCHRONOUS=%s: commits are not fsynced, "
+                    "acknowledged writes can be lost on power failure", SYNCHRONOUS
+                )
+            _writer = GroupCommitWriter(transaction, GROUP_COMMIT_WINDOW_MS / 1000, GROUP_COMMIT_MAX_BATCH)
+    
+    return _writer
+
+
+def submit_write(func: Callable, *args, **kwargs) -> Future:
+    """Queue a write function for the next group commit"""
+    return _get_writer().submit(func, *args, **kwargs)
+
+
+def close_writer():
+    """Flush and stop the group commit writer"""
+    global _writer
+    
+    with _writer_lock:
+        if _writer is not None:
+            _writer.close()
+            _writer = None
+
+
+def _mark_processed(conn: sqlite3.Connection, update_id: int):
+    cursor = conn.execute(
+        "INSERT OR IGNORE INTO processed_updates (update_id, processed_at) VALUES (?, ?)",
+        (update_id, now_epoch())
+    )
+    
+    if not cursor.rowcount:
+        raise DuplicateUpdate(update_id)
+
+
+def _write(func: Callable, *args, update_id: Optional[int] = None):
+    """Run func(conn, *args) in a transaction, batched when group commit is on"""
+    if GROUP_COMMIT and not get_connection().in_transaction:
+        # Blocks until the batch holding this write has committed
+        return submit_write(_write, func, *args, update_id=update_id).result()
+    
+    with transaction() as conn:
+        # Recorded in the same transaction, so a retried update can't apply twice
+        if update_id is not None:
+            _mark_processed(conn, update_id)
+        return func(conn, *args)
+
+
+def _migrate_base_tables(conn: sqlite3.Connection):
+    """Create the original tables (no-op on existing databases)"""
     # Savings table
-    cursor.execute("""
+    conn.execute("""
         CREATE TABLE IF NOT EXISTS savings (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             amount REAL NOT NULL,
@@ -34,7 +190,7 @@ def init_database():
     """)
     
     # Expenses table
-    cursor.execute("""
+    conn.execute("""
         CREATE TABLE IF NOT EXISTS expenses (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             amount REAL NOT NULL,
@@ -44,7 +200,7 @@ def init_database():
     """)
     
     # Notes table
-    cursor.execute("""
+    conn.execute("""
         CREATE TABLE IF NOT EXISTS notes (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             title TEXT UNIQUE NOT NULL,
@@ -53,211 +209,1360 @@ def init_database():
             updated_at TEXT NOT NULL
         )
     """)
+
+
+def _migrate_savings_balance(conn: sqlite3.Connection):
+    """Materialized savings balance, kept in step with the ledger"""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS savings_balance (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            balance REAL NOT NULL
+        )
+    """)
+    conn.execute("""
+        INSERT OR IGNORE INTO savings_balance (id, balance)
+        SELECT 1, COALESCE(SUM(amount), 0) FROM savings
+    """)
+
+
+def _migrate_period_indexes(conn: sqlite3.Connection):
+    """Covering indexes for the created_at range queries"""
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_expenses_created_at
+        ON expenses (created_at, amount, description)
+    """)
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_savings_created_at
+        ON savings (created_at, amount, transaction_type)
+    """)
+
+
+def _migrate_expense_rollup(conn: sqlite3.Connection):
+    """Per-day expense totals, maintained incrementally by add_expense"""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS expense_daily_rollup (
+            day TEXT PRIMARY KEY,
+            total REAL NOT NULL,
+            count INTEGER NOT NULL
+        )
+    """)
+    conn.execute("""
+        INSERT INTO expense_daily_rollup (day, total, count)
+        SELECT substr(created_at, 1, 10), SUM(amount), COUNT(*)
+        FROM expenses
+        GROUP BY substr(created_at, 1, 10)
+    """)
+
+
+def _migrate_notes_updated_index(conn: sqlite3.Connection):
+    """Index for the keyset-paginated notes list"""
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_notes_updated_at
+        ON notes (updated_at, title)
+    """)
+
+
+def _migrate_user_tenancy(conn: sqlite3.Connection):
+    """Add a user_id dimension to every table, with per-user composite indexes"""
+    if not LEGACY_USER_ID:
+        rows = conn.execute(
+            "SELECT (SELECT COUNT(*) FROM savings) + (SELECT COUNT(*) FROM expenses) + (SELECT COUNT(*) FROM notes)"
+        ).fetchone()[0]
+        if rows:
+            logger.warning(
+                f"Neither LEGACY_USER_ID nor OWNER_ID is set: {rows} existing rows are assigned to "
+                "user 0 and no Telegram user will see them. Move them with "
+                "UPDATE <table> SET user_id = <your id> WHERE user_id = 0"
+            )
+    
+    conn.execute("""
+        CREATE TABLE savings_new (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            amount REAL NOT NULL,
+            transaction_type TEXT NOT NULL,
+            created_at TEXT NOT NULL
+        )
+    """)
+    conn.execute(
+        """
+        INSERT INTO savings_new (id, user_id, amount, transaction_type, created_at)
+        SELECT id, ?, amount, transaction_type, created_at FROM savings
+        """,
+        (LEGACY_USER_ID,)
+    )
+    
+    conn.execute("""
+        CREATE TABLE expenses_new (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            amount REAL NOT NULL,
+            description TEXT NOT NULL,
+            created_at TEXT NOT NULL
+        )
+    """)
+    conn.execute(
+        """
+        INSERT INTO expenses_new (id, user_id, amount, description, created_at)
+        SELECT id, ?, amount, description, created_at FROM expenses
+        """,
+        (LEGACY_USER_ID,)
+    )
+    
+    # Titles are unique per user instead of globally
+    conn.execute("""
+        CREATE TABLE notes_new (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            title TEXT NOT NULL,
+            content TEXT NOT NULL,
+            created_at TEXT NOT NULL,
+            updated_at TEXT NOT NULL,
+            UNIQUE (user_id, title)
+        )
+    """)
+    conn.execute(
+        """
+        INSERT INTO notes_new (id, user_id, title, content, created_at, updated_at)
+        SELECT id, ?, title, content, created_at, updated_at FROM notes
+        """,
+        (LEGACY_USER_ID,)
+    )
+    
+    conn.execute("""
+        CREATE TABLE savings_balance_new (
+            user_id INTEGER PRIMARY KEY,
+            balance REAL NOT NULL
+        )
+    """)
+    conn.execute(
+        "INSERT INTO savings_balance_new (user_id, balance) SELECT ?, balance FROM savings_balance",
+        (LEGACY_USER_ID,)
+    )
+    
+    conn.execute("""
+        CREATE TABLE expense_daily_rollup_new (
+            user_id INTEGER NOT NULL,
+            day TEXT NOT NULL,
+            total REAL NOT NULL,
+            count INTEGER NOT NULL,
+            PRIMARY KEY (user_id, day)
+        ) WITHOUT ROWID
+    """)
+    conn.execute(
+        """
+        INSERT INTO expense_daily_rollup_new (user_id, day, total, count)
+        SELECT ?, day, total, count FROM expense_daily_rollup
+        """,
+        (LEGACY_USER_ID,)
+    )
+    
+    for table in ("savings", "expenses", "notes", "savings_balance", "expense_daily_rollup"):
+        conn.execute(f"DROP TABLE {table}")
+        conn.execute(f"ALTER TABLE {table}_new RENAME TO {table}")
+    
+    conn.execute("""
+        CREATE INDEX idx_savings_user_created
+        ON savings (user_id, created_at, amount, transaction_type)
+    """)
+    conn.execute("""
+        CREATE INDEX idx_expenses_user_created
+        ON expenses (user_id, created_at, amount, description)
+    """)
+    conn.execute("""
+        CREATE INDEX idx_notes_user_updated
+        ON notes (user_id, updated_at, title)
+    """)
+    
+    conn.execute("""
+        CREATE TABLE allowed_users (
+            user_id INTEGER PRIMARY KEY,
+            is_admin INTEGER NOT NULL DEFAULT 0,
+            added_at TEXT NOT NULL
+        )
+    """)
+
+
+def _migrate_processed_updates(conn: sqlite3.Connection):
+    """Telegram update_ids whose writes are committed, for deduplicating retries"""
+    conn.execute("""
+        CREATE TABLE processed_updates (
+            update_id INTEGER PRIMARY KEY,
+            processed_at TEXT NOT NULL
+        )
+    """)
+    conn.execute("""
+        CREATE INDEX idx_processed_updates_processed_at
+        ON processed_updates (processed_at)
+    """)
+
+
+def _migrate_meta(conn: sqlite3.Connection):
+    """Key-value store for deployment state"""
+    conn.execute("""
+        CREATE TABLE meta (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL
+        )
+    """)
+
+
+def _create_notes_fts_triggers(conn: sqlite3.Connection):
+    """Keep the original notes_fts in sync with notes (before migration 12)"""
+    conn.execute("""
+        CREATE TRIGGER notes_fts_insert AFTER INSERT ON notes BEGIN
+            INSERT INTO notes_fts (rowid, title, content) VALUES (new.id, new.title, new.content);
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER notes_fts_delete AFTER DELETE ON notes BEGIN
+            INSERT INTO notes_fts (notes_fts, rowid, title, content)
+            VALUES ('delete', old.id, old.title, old.content);
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER notes_fts_update AFTER UPDATE ON notes BEGIN
+            INSERT INTO notes_fts (notes_fts, rowid, title, content)
+            VALUES ('delete', old.id, old.title, old.content);
+            INSERT INTO notes_fts (rowid, title, content) VALUES (new.id, new.title, new.content);
+        END
+    """)
+
+
+def _migrate_notes_search(conn: sqlite3.Connection):
+    """Full-text index over notes and a title trigram index for suggestions"""
+    # External content table, kept in sync with notes by triggers
+    conn.execute("""
+        CREATE VIRTUAL TABLE notes_fts USING fts5(
+            title, content,
+            content='notes', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2'
+        )
+    """)
+    conn.execute("INSERT INTO notes_fts (notes_fts) VALUES ('rebuild')")
+    _create_notes_fts_triggers(conn)
     
-    conn.commit()
-    conn.close()
+    conn.execute("""
+        CREATE TABLE note_trigrams (
+            user_id INTEGER NOT NULL,
+            trigram TEXT NOT NULL,
+            note_id INTEGER NOT NULL,
+            PRIMARY KEY (user_id, trigram, note_id)
+        ) WITHOUT ROWID
+    """)
+    rows = conn.execute("SELECT id, user_id, title FROM notes").fetchall()
+    for row in rows:
+        padded = f"  {row['title'].lower()} "
+        conn.executemany(
+            "INSERT OR IGNORE INTO note_trigrams (user_id, trigram, note_id) VALUES (?, ?, ?)",
+            [(row["user_id"], padded[i:i + 3], row["id"]) for i in range(len(padded) - 2)]
+        )
 
 
-# ==================== SAVINGS ====================
+def _migrate_integer_amounts(conn: sqlite3.Connection):
+    """Store money as whole rupiah INTEGERs instead of REAL"""
+    conn.execute("""
+        CREATE TABLE savings_new (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            amount INTEGER NOT NULL,
+            transaction_type TEXT NOT NULL,
+            created_at TEXT NOT NULL
+        )
+    """)
+    conn.execute("""
+        INSERT INTO savings_new (id, user_id, amount, transaction_type, created_at)
+        SELECT id, user_id, CAST(ROUND(amount) AS INTEGER), transaction_type, created_at FROM savings
+    """)
+    
+    conn.execute("""
+        CREATE TABLE expenses_new (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            amount INTEGER NOT NULL,
+            description TEXT NOT NULL,
+            created_at TEXT NOT NULL
+        )
+    """)
+    conn.execute("""
+        INSERT INTO expenses_new (id, user_id, amount, description, created_at)
+        SELECT id, user_id, CAST(ROUND(amount) AS INTEGER), description, created_at FROM expenses
+    """)
+    
+    # Balances and rollups are recomputed from the rounded rows, so they
+    # agree exactly with the ledger from here on
+    conn.execute("""
+        CREATE TABLE savings_balance_new (
+            user_id INTEGER PRIMARY KEY,
+            balance INTEGER NOT NULL
+        )
+    """)
+    conn.execute("""
+        INSERT INTO savings_balance_new (user_id, balance)
+        SELECT user_id, SUM(amount) FROM savings_new GROUP BY user_id
+    """)
+    
+    conn.execute("""
+        CREATE TABLE expense_daily_rollup_new (
+            user_id INTEGER NOT NULL,
+            day TEXT NOT NULL,
+            total INTEGER NOT NULL,
+            count INTEGER NOT NULL,
+            PRIMARY KEY (user_id, day)
+        ) WITHOUT ROWID
+    """)
+    conn.execute("""
+        INSERT INTO expense_daily_rollup_new (user_id, day, total, count)
+        SELECT user_id, substr(created_at, 1, 10), SUM(amount), COUNT(*)
+        FROM expenses_new
+        GROUP BY user_id, substr(created_at, 1, 10)
+    """)
+    
+    for table in ("savings", "expenses", "savings_balance", "expense_daily_rollup"):
+        conn.execute(f"DROP TABLE {table}")
+        conn.execute(f"ALTER TABLE {table}_new RENAME TO {table}")
+    
+    conn.execute("""
+        CREATE INDEX idx_savings_user_created
+        ON savings (user_id, created_at, amount, transaction_type)
+    """)
+    conn.execute("""
+        CREATE INDEX idx_expenses_user_created
+        ON expenses (user_id, created_at, amount, description)
+    """)
 
-def add_savings(amount: float) -> float:
-    """Add money to savings, returns new balance"""
-    conn = get_connection()
-    cursor = conn.cursor()
+
+def _migrate_epoch_timestamps(conn: sqlite3.Connection):
+    """Store timestamps as indexed UTC epoch seconds and add per-user timezones"""
+    # Old values are naive server-local times from datetime.now(); the 'utc'
+    # modifier converts them from the local zone of this process
+    epoch = "CAST(strftime('%s', {}, 'utc') AS INTEGER)"
+    
+    conn.execute("""
+        CREATE TABLE savings_new (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            amount INTEGER NOT NULL,
+            transaction_type TEXT NOT NULL,
+            created_at INTEGER NOT NULL
+        )
+    """)
+    conn.execute(f"""
+        INSERT INTO savings_new (id, user_id, amount, transaction_type, created_at)
+        SELECT id, user_id, amount, transaction_type, {epoch.format('created_at')} FROM savings
+    """)
+    
+    conn.execute("""
+        CREATE TABLE expenses_new (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            amount INTEGER NOT NULL,
+            description TEXT NOT NULL,
+            created_at INTEGER NOT NULL
+        )
+    """)
+    conn.execute(f"""
+        INSERT INTO expenses_new (id, user_id, amount, description, created_at)
+        SELECT id, user_id, amount, description, {epoch.format('created_at')} FROM expenses
+    """)
     
-    cursor.execute(
-        "INSERT INTO savings (amount, transaction_type, created_at) VALUES (?, ?, ?)",
-        (amount, "deposit", datetime.now().isoformat())
+    conn.execute("""
+        CREATE TABLE notes_new (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            title TEXT NOT NULL,
+            content TEXT NOT NULL,
+            created_at INTEGER NOT NULL,
+            updated_at INTEGER NOT NULL,
+            UNIQUE (user_id, title)
+        )
+    """)
+    conn.execute(f"""
+        INSERT INTO notes_new (id, user_id, title, content, created_at, updated_at)
+        SELECT id, user_id, title, content, {epoch.format('created_at')}, {epoch.format('updated_at')}
+        FROM notes
+    """)
+    
+    conn.execute("""
+        CREATE TABLE processed_updates_new (
+            update_id INTEGER PRIMARY KEY,
+            processed_at INTEGER NOT NULL
+        )
+    """)
+    conn.execute(f"""
+        INSERT INTO processed_updates_new (update_id, processed_at)
+        SELECT update_id, {epoch.format('processed_at')} FROM processed_updates
+    """)
+    
+    conn.execute("""
+        CREATE TABLE allowed_users_new (
+            user_id INTEGER PRIMARY KEY,
+            is_admin INTEGER NOT NULL DEFAULT 0,
+            added_at INTEGER NOT NULL
+        )
+    """)
+    conn.execute(f"""
+        INSERT INTO allowed_users_new (user_id, is_admin, added_at)
+        SELECT user_id, is_admin, {epoch.format('added_at')} FROM allowed_users
+    """)
+    
+    for table in ("savings", "expenses", "notes", "processed_updates", "allowed_users"):
+        conn.execute(f"DROP TABLE {table}")
+        conn.execute(f"ALTER TABLE {table}_new RENAME TO {table}")
+    
+    conn.execute("""
+        CREATE INDEX idx_savings_user_created
+        ON savings (user_id, created_at, amount, transaction_type)
+    """)
+    conn.execute("""
+        CREATE INDEX idx_expenses_user_created
+        ON expenses (user_id, created_at, amount, description)
+    """)
+    conn.execute("""
+        CREATE INDEX idx_notes_user_updated
+        ON notes (user_id, updated_at, title)
+    """)
+    conn.execute("""
+        CREATE INDEX idx_processed_updates_processed_at
+        ON processed_updates (processed_at)
+    """)
+    
+    # Note ids are unchanged, so the trigram rows still match; the FTS
+    # triggers went with the old table
+    _create_notes_fts_triggers(conn)
+    conn.execute("INSERT INTO notes_fts (notes_fts) VALUES ('rebuild')")
+    
+    conn.execute("""
+        CREATE TABLE user_settings (
+            user_id INTEGER PRIMARY KEY,
+            timezone TEXT NOT NULL
+        )
+    """)
+    
+    # Rollup days were server-local dates; nobody has a zone yet, so
+    # regroup everything in the default zone
+    conn.execute("DELETE FROM expense_daily_rollup")
+    conn.execute(
+        """
+        INSERT INTO expense_daily_rollup (user_id, day, total, count)
+        SELECT user_id, local_day(created_at, ?), SUM(amount), COUNT(*)
+        FROM expenses
+        GROUP BY user_id, local_day(created_at, ?)
+        """,
+        (DEFAULT_TIMEZONE, DEFAULT_TIMEZONE)
     )
+
+
+def _migrate_notes_search_owner(conn: sqlite3.Connection):
+    """Index each note's owner in notes_fts, so searches only touch one user's hits"""
+    for trigger in ("notes_fts_insert", "notes_fts_delete", "notes_fts_update"):
+        conn.execute(f"DROP TRIGGER {trigger}")
+    conn.execute("DROP TABLE notes_fts")
     
-    conn.commit()
-    conn.close()
+    # External content must supply every FTS column, so the owner token
+    # comes from a view over notes
+    conn.execute("""
+        CREATE VIEW notes_fts_source AS
+        SELECT id, title, content, 'u' || user_id AS owner FROM notes
+    """)
+    conn.execute("""
+        CREATE VIRTUAL TABLE notes_fts USING fts5(
+            title, content, owner,
+            content='notes_fts_source', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2'
+        )
+    """)
+    conn.execute("INSERT INTO notes_fts (notes_fts) VALUES ('rebuild')")
+    _create_notes_fts_owner_triggers(conn)
+
+
+def _create_notes_fts_owner_triggers(conn: sqlite3.Connection):
+    """Keep the owner-aware notes_fts in sync; dropped whenever notes is rebuilt"""
+    conn.execute("""
+        CREATE TRIGGER notes_fts_insert AFTER INSERT ON notes BEGIN
+            INSERT INTO notes_fts (rowid, title, content, owner)
+            VALUES (new.id, new.title, new.content, 'u' || new.user_id);
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER notes_fts_delete AFTER DELETE ON notes BEGIN
+            INSERT INTO notes_fts (notes_fts, rowid, title, content, owner)
+            VALUES ('delete', old.id, old.title, old.content, 'u' || old.user_id);
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER notes_fts_update AFTER UPDATE ON notes BEGIN
+            INSERT INTO notes_fts (notes_fts, rowid, title, content, owner)
+            VALUES ('delete', old.id, old.title, old.content, 'u' || old.user_id);
+            INSERT INTO notes_fts (rowid, title, content, owner)
+            VALUES (new.id, new.title, new.content, 'u' || new.user_id);
+        END
+    """)
+
+
+# Ordered schema migrations: (version, description, function).
+# Append new entries only, never renumber or edit applied ones.
+MIGRATIONS = [
+    (1, "base tables", _migrate_base_tables),
+    (2, "materialized savings balance", _migrate_savings_balance),
+    (3, "created_at period indexes", _migrate_period_indexes),
+    (4, "daily expense rollup", _migrate_expense_rollup),
+    (5, "notes updated_at index", _migrate_notes_updated_index),
+    (6, "per-user tenancy and allowlist", _migrate_user_tenancy),
+    (7, "processed updates", _migrate_processed_updates),
+    (8, "meta", _migrate_meta),
+    (9, "notes full-text search and title trigrams", _migrate_notes_search),
+    (10, "integer rupiah amounts", _migrate_integer_amounts),
+    (11, "epoch timestamps and user timezones", _migrate_epoch_timestamps),
+    (12, "owner column in notes full-text index", _migrate_notes_search_owner),
+]
+
+
+def run_migrations() -> int:
+    """Apply pending migrations in order, returns the schema version"""
+    conn = get_connection()
+    
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            description TEXT NOT NULL,
+            applied_at TEXT NOT NULL
+        )
+    """)
     
-    return get_savings_balance()
+    for version, description, migrate in MIGRATIONS:
+        # Check inside the write lock so concurrent starters apply each step once
+        with transaction():
+            cursor = conn.execute("SELECT 1 FROM schema_version WHERE version = ?", (version,))
+            if cursor.fetchone():
+                continue
+            
+            migrate(conn)
+            conn.execute(
+                "INSERT INTO schema_version (version, description, applied_at) VALUES (?, ?, ?)",
+                (version, description, datetime.now().isoformat())
+            )
+    
+    return get_schema_version()
 
 
-def withdraw_savings(amount: float) -> Tuple[bool, float, str]:
-    """Withdraw from savings, returns (success, balance, message)"""
-    current_balance = get_savings_balance()
+@track_query
+def get_schema_version() -> int:
+    """Get the highest applied migration version"""
+    conn = get_connection()
+    
+    cursor = conn.execute("SELECT COALESCE(MAX(version), 0) as version FROM schema_version")
+    
+    return cursor.fetchone()["version"]
+
+
+def init_database():
+    """Initialize database and apply schema migrations"""
+    conn = get_connection()
+    
+    # WAL is persistent in the database file, so this only needs to run once
+    conn.execute("PRAGMA journal_mode = WAL")
+    
+    run_migrations()
+
+
+def _iter_rows(cursor: sqlite3.Cursor) -> Iterator[dict]:
+    """Yield rows lazily from an open cursor"""
+    try:
+        for row in cursor:
+            yield dict(row)
+    finally:
+        cursor.close()
+
+
+def _keyset(columns: str, cursor: Optional[tuple], reverse: bool) -> Tuple[str, str, tuple]:
+    """Build the keyset predicate and ORDER BY for newest-first paging"""
+    # Forward pages walk newest to oldest, reverse pages walk back up
+    op, order = (">", "ASC") if reverse else ("<", "DESC")
+    names = [name.strip() for name in columns.split(",")]
+    order_by = ", ".join(f"{name} {order}" for name in names)
+    
+    if cursor is None:
+        return "", order_by, ()
+    
+    return f"AND ({columns}) {op} ({', '.join('?' * len(names))})", order_by, tuple(cursor)
+
+
+# ==================== USERS ====================
+
+@track_query
+def allow_user(user_id: int, is_admin: bool = False) -> bool:
+    """Add a user to the allowlist, returns False if already allowed"""
+    with transaction() as conn:
+        cursor = conn.execute(
+            "INSERT OR IGNORE INTO allowed_users (user_id, is_admin, added_at) VALUES (?, ?, ?)",
+            (user_id, int(is_admin), now_epoch())
+        )
+        
+        if not cursor.rowcount and is_admin:
+            conn.execute("UPDATE allowed_users SET is_admin = 1 WHERE user_id = ?", (user_id,))
     
-    if amount > current_balance:
-        return False, current_balance, f"Saldo tidak cukup. Saldo saat ini: Rp {current_balance:,.0f}"
+    return bool(cursor.rowcount)
+
+
+@track_query
+def revoke_user(user_id: int) -> bool:
+    """Remove a user from the allowlist, returns False if not allowed"""
+    with transaction() as conn:
+        cursor = conn.execute("DELETE FROM allowed_users WHERE user_id = ?", (user_id,))
     
+    return bool(cursor.rowcount)
+
+
+@track_query
+def get_allowed_users() -> dict:
+    """Get allowed users as {user_id: is_admin}"""
     conn = get_connection()
-    cursor = conn.cursor()
     
-    cursor.execute(
-        "INSERT INTO savings (amount, transaction_type, created_at) VALUES (?, ?, ?)",
-        (-amount, "withdraw", datetime.now().isoformat())
+    cursor = conn.execute("SELECT user_id, is_admin FROM allowed_users")
+    
+    return {row["user_id"]: bool(row["is_admin"]) for row in cursor.fetchall()}
+
+
+# ==================== META ====================
+
+@track_query
+def get_meta(key: str) -> Optional[str]:
+    """Get a deployment state value"""
+    row = get_connection().execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+    
+    return row["value"] if row else None
+
+
+@track_query
+def set_meta(key: str, value: str):
+    """Store a deployment state value"""
+    with transaction() as conn:
+        conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+
+# ==================== UPDATES ====================
+
+@track_query
+def prune_processed_updates() -> int:
+    """Forget update_ids older than PROCESSED_UPDATE_TTL, returns rows removed"""
+    cutoff = now_epoch() - PROCESSED_UPDATE_TTL
+    
+    with transaction() as conn:
+        cursor = conn.execute("DELETE FROM processed_updates WHERE processed_at < ?", (cutoff,))
+    
+    return cursor.rowcount
+
+
+# ==================== SETTINGS ====================
+
+@track_query
+def get_user_timezone(user_id: int) -> str:
+    """Get a user's IANA timezone, BOT_TIMEZONE if they haven't set one"""
+    row = get_connection().execute(
+        "SELECT timezone FROM user_settings WHERE user_id = ?", (user_id,)
+    ).fetchone()
+    
+    return row["timezone"] if row else DEFAULT_TIMEZONE
+
+
+@track_query
+def set_user_timezone(user_id: int, timezone: str):
+    """Set a user's timezone and regroup their daily rollup into it"""
+    with transaction() as conn:
+        conn.execute(
+            """
+            INSERT INTO user_settings (user_id, timezone) VALUES (?, ?)
+            ON CONFLICT(user_id) DO UPDATE SET timezone = excluded.timezone
+            """,
+            (user_id, timezone)
+        )
+        _rebuild_expense_rollup(conn, user_id)
+
+
+# ==================== SAVINGS ====================
+
+def _add_savings(conn: sqlite3.Connection, user_id: int, amount: int) -> int:
+    if get_savings_balance(user_id) + amount > MAX_BALANCE:
+        raise AmountTooLarge(f"Balance would exceed {MAX_BALANCE}")
+    
+    conn.execute(
+        "INSERT INTO savings (user_id, amount, transaction_type, created_at) VALUES (?, ?, ?, ?)",
+        (user_id, amount, "deposit", now_epoch())
+    )
+    conn.execute(
+        """
+        INSERT INTO savings_balance (user_id, balance) VALUES (?, ?)
+        ON CONFLICT(user_id) DO UPDATE SET balance = balance + excluded.balance
+        """,
+        (user_id, amount)
+    )
+    
+    return get_savings_balance(user_id)
+
+
+@track_query
+def add_savings(user_id: int, amount: int, update_id: Optional[int] = None) -> int:
+    """Add money to savings, returns new balance"""
+    return _write(_add_savings, user_id, amount, update_id=update_id)
+
+
+def _withdraw_savings(conn: sqlite3.Connection, user_id: int, amount: int) -> Tuple[bool, int, str]:
+    # Conditional update, so concurrent withdrawals can never overdraw
+    cursor = conn.execute(
+        "UPDATE savings_balance SET balance = balance - ? WHERE user_id = ? AND balance >= ?",
+        (amount, user_id, amount)
     )
     
-    conn.commit()
-    conn.close()
+    if not cursor.rowcount:
+        current_balance = get_savings_balance(user_id)
+        return False, current_balance, f"Saldo tidak cukup. Saldo saat ini: {rupiah(current_balance)}"
+    
+    conn.execute(
+        "INSERT INTO savings (user_id, amount, transaction_type, created_at) VALUES (?, ?, ?, ?)",
+        (user_id, -amount, "withdraw", now_epoch())
+    )
     
-    new_balance = get_savings_balance()
-    return True, new_balance, f"Berhasil mengambil Rp {amount:,.0f}. Saldo sekarang: Rp {new_balance:,.0f}"
+    new_balance = get_savings_balance(user_id)
+    return True, new_balance, f"Berhasil mengambil {rupiah(amount)}. Saldo sekarang: {rupiah(new_balance)}"
 
 
-def get_savings_balance() -> float:
+@track_query
+def withdraw_savings(user_id: int, amount: int, update_id: Optional[int] = None) -> Tuple[bool, int, str]:
+    """Withdraw from savings, returns (success, balance, message)"""
+    return _write(_withdraw_savings, user_id, amount, update_id=update_id)
+
+
+@track_query
+def get_savings_balance(user_id: int) -> int:
     """Get current savings balance"""
     conn = get_connection()
-    cursor = conn.cursor()
     
-    cursor.execute("SELECT COALESCE(SUM(amount), 0) as balance FROM savings")
+    cursor = conn.execute("SELECT balance FROM savings_balance WHERE user_id = ?", (user_id,))
     result = cursor.fetchone()
     
-    conn.close()
-    
     return result["balance"] if result else 0
 
 
-def get_savings_history(limit: int = 10) -> List[dict]:
+@track_query
+def reconcile_savings_balance(user_id: int, fix: bool = False) -> Tuple[int, int]:
+    """Compare stored balance with the ledger sum, returns (stored, ledger)"""
+    with transaction() as conn:
+        stored = get_savings_balance(user_id)
+        
+        cursor = conn.execute(
+            "SELECT COALESCE(SUM(amount), 0) as balance FROM savings WHERE user_id = ?",
+            (user_id,)
+        )
+        ledger = cursor.fetchone()["balance"]
+        
+        if fix and stored != ledger:
+            conn.execute(
+                "INSERT OR REPLACE INTO savings_balance (user_id, balance) VALUES (?, ?)",
+                (user_id, ledger)
+            )
+    
+    return stored, ledger
+
+
+@track_query
+def get_savings_history(user_id: int, limit: int = 10) -> List[dict]:
     """Get savings transaction history"""
     conn = get_connection()
-    cursor = conn.cursor()
     
-    cursor.execute(
-        "SELECT * FROM savings ORDER BY created_at DESC LIMIT ?",
-        (limit,)
+    cursor = conn.execute(
+        "SELECT * FROM savings WHERE user_id = ? ORDER BY created_at DESC LIMIT ?",
+        (user_id, limit)
     )
     
-    rows = cursor.fetchall()
-    conn.close()
-    
-    return [dict(row) for row in rows]
+    return [dict(row) for row in cursor.fetchall()]
 
 
 # ==================== EXPENSES ====================
 
-def add_expense(amount: float, description: str) -> int:
-    """Add an expense record, returns expense id"""
-    conn = get_connection()
-    cursor = conn.cursor()
+def _add_expense(conn: sqlite3.Connection, user_id: int, amount: int, description: str) -> int:
+    created_at = now_epoch()
     
-    cursor.execute(
-        "INSERT INTO expenses (amount, description, created_at) VALUES (?, ?, ?)",
-        (amount, description, datetime.now().isoformat())
+    cursor = conn.execute(
+        "INSERT INTO expenses (user_id, amount, description, created_at) VALUES (?, ?, ?, ?)",
+        (user_id, amount, description, created_at)
+    )
+    conn.execute(
+        """
+        INSERT INTO expense_daily_rollup (user_id, day, total, count) VALUES (?, ?, ?, 1)
+        ON CONFLICT(user_id, day) DO UPDATE SET total = total + excluded.total, count = count + 1
+        """,
+        (user_id, local_day(created_at, get_user_timezone(user_id)), amount)
     )
     
-    expense_id = cursor.lastrowid
-    conn.commit()
-    conn.close()
+    return cursor.lastrowid
+
+
+@track_query
+def add_expense(user_id: int, amount: int, description: str, update_id: Optional[int] = None) -> int:
+    """Add an expense record, returns expense id"""
+    return _write(_add_expense, user_id, amount, description, update_id=update_id)
+
+
+def _rebuild_expense_rollup(conn: sqlite3.Connection, user_id: int):
+    """Recompute a user's daily rollup from the raw expenses, in their zone"""
+    zone = get_user_timezone(user_id)
     
-    return expense_id
+    conn.execute("DELETE FROM expense_daily_rollup WHERE user_id = ?", (user_id,))
+    conn.execute(
+        """
+        INSERT INTO expense_daily_rollup (user_id, day, total, count)
+        SELECT user_id, local_day(created_at, ?), SUM(amount), COUNT(*)
+        FROM expenses
+        WHERE user_id = ?
+        GROUP BY local_day(created_at, ?)
+        """,
+        (zone, user_id, zone)
+    )
 
 
-def get_expenses_by_period(start_date: datetime, end_date: datetime) -> List[dict]:
+@track_query
+def rebuild_expense_rollup(user_id: int):
+    """Rebuild a user's daily expense rollup from existing data"""
+    with transaction() as conn:
+        _rebuild_expense_rollup(conn, user_id)
+
+
+@track_query
+def get_expenses_by_period(user_id: int, start_date: datetime, end_date: datetime) -> List[dict]:
     """Get expenses within a date range"""
     conn = get_connection()
-    cursor = conn.cursor()
     
-    cursor.execute(
+    cursor = conn.execute(
         """
         SELECT * FROM expenses 
-        WHERE created_at >= ? AND created_at <= ?
+        WHERE user_id = ? AND created_at >= ? AND created_at <= ?
         ORDER BY created_at DESC
         """,
-        (start_date.isoformat(), end_date.isoformat())
+        (user_id, to_epoch(start_date), to_epoch(end_date))
     )
     
-    rows = cursor.fetchall()
-    conn.close()
-    
-    return [dict(row) for row in rows]
+    return [dict(row) for row in cursor.fetchall()]
 
 
-def get_total_expenses_by_period(start_date: datetime, end_date: datetime) -> float:
+@track_query
+def get_total_expenses_by_period(user_id: int, start_date: datetime, end_date: datetime) -> int:
     """Get total expenses within a date range"""
     conn = get_connection()
-    cursor = conn.cursor()
     
-    cursor.execute(
+    cursor = conn.execute(
         """
         SELECT COALESCE(SUM(amount), 0) as total FROM expenses 
-        WHERE created_at >= ? AND created_at <= ?
+        WHERE user_id = ? AND created_at >= ? AND created_at <= ?
         """,
-        (start_date.isoformat(), end_date.isoformat())
+        (user_id, to_epoch(start_date), to_epoch(end_date))
     )
-    
     result = cursor.fetchone()
-    conn.close()
     
     return result["total"] if result else 0
 
 
-# ==================== NOTES ====================
+@track_query
+def get_expense_report(user_id: int, start_date: datetime, end_date: datetime) -> dict:
+    """Get per-day totals and counts plus the grand total from the daily rollup"""
+    conn = get_connection()
+    
+    # Running totals are prefix sums over days, so any range costs O(days)
+    cursor = conn.execute(
+        """
+        SELECT day, total, count,
+               SUM(total) OVER (ORDER BY day) as running_total,
+               SUM(total) OVER () as grand_total,
+               SUM(count) OVER () as grand_count
+        FROM expense_daily_rollup
+        WHERE user_id = ? AND day >= ? AND day <= ?
+        ORDER BY day DESC
+        """,
+        (user_id, start_date.strftime("%Y-%m-%d"), end_date.strftime("%Y-%m-%d"))
+    )
+    rows = cursor.fetchall()
+    
+    return {
+        "days": [
+            {
+                "day": row["day"],
+                "total": row["total"],
+                "count": row["count"],
+                "running_total": row["running_total"],
+            }
+            for row in rows
+        ],
+        "total": rows[0]["grand_total"] if rows else 0,
+        "count": rows[0]["grand_count"] if rows else 0,
+    }
 
-def save_note(title: str, content: str) -> Tuple[bool, str]:
-    """Save or update a note"""
+
+@track_query
+def iter_expenses(
+    user_id: int,
+    start_date: datetime,
+    end_date: datetime,
+    cursor: Optional[Tuple[int, int]] = None,
+    reverse: bool = False,
+) -> Iterator[dict]:
+    """Stream expenses in a date range newest first, after a (created_at, id) cursor"""
+    predicate, order_by, params = _keyset("created_at, id", cursor, reverse)
+    
+    rows = get_connection().execute(
+        f"""
+        SELECT id, amount, description, created_at FROM expenses
+        WHERE user_id = ? AND created_at >= ? AND created_at <= ? {predicate}
+        ORDER BY {order_by}
+        """,
+        (user_id, to_epoch(start_date), to_epoch(end_date)) + params
+    )
+    
+    return _iter_rows(rows)
+
+
+@track_query
+def iter_expense_days(
+    user_id: int,
+    start_date: datetime,
+    end_date: datetime,
+    cursor: Optional[Tuple[str]] = None,
+    reverse: bool = False,
+) -> Iterator[dict]:
+    """Stream daily rollup rows newest first, with running totals over the whole range"""
+    predicate, order_by, params = _keyset("day", cursor, reverse)
+    
+    rows = get_connection().execute(
+        f"""
+        SELECT * FROM (
+            SELECT day, total, count, SUM(total) OVER (ORDER BY day) as running_total
+            FROM expense_daily_rollup
+            WHERE user_id = ? AND day >= ? AND day <= ?
+        )
+        WHERE 1 {predicate}
+        ORDER BY {order_by}
+        """,
+        (user_id, start_date.strftime("%Y-%m-%d"), end_date.strftime("%Y-%m-%d")) + params
+    )
+    
+    return _iter_rows(rows)
+
+
+# ==================== IMPORT ====================
+
+# Rows per executemany batch during bulk imports
+IMPORT_CHUNK_SIZE = 500
+
+
+def _without_overdrafts(rows: Iterable[tuple], balance: int, reject: Optional[Callable[[tuple, str], None]]) -> Iterator[tuple]:
+    """Drop withdrawals the running balance can't cover, passing them to reject(row, reason)"""
+    # Runs as rows are pulled, so reject sees each row while it is current;
+    # without a reject callback an overdraft aborts the whole import
+    for row in rows:
+        kind, _, amount, _ = row
+        if kind == "deposit":
+            balance += amount
+            if balance > MAX_BALANCE:
+                raise AmountTooLarge(f"saldo melebihi batas {rupiah(MAX_BALANCE)}")
+        elif kind == "withdraw":
+            if amount > balance:
+                reason = f"saldo tidak cukup untuk mengambil {rupiah(amount)} (saldo {rupiah(balance)})"
+                if reject is None:
+                    raise ValueError(reason)
+                reject(row, reason)
+                continue
+            balance -= amount
+        yield row
+
+
+@track_query
+def import_transactions(
+    user_id: int,
+    rows: Iterable[Tuple[str, int, int, str]],
+    update_id: Optional[int] = None,
+    progress: Optional[Callable[[int], None]] = None,
+    reject: Optional[Callable[[tuple, str], None]] = None,
+) -> Tuple[int, int]:
+    """Bulk insert (kind, created_at, amount, description) rows in one transaction, returns (expenses, savings)"""
+    # kind is "expense", "deposit" or "withdraw". Rows are parsed into a TEMP
+    # table first: TEMP writes don't take the main database's write lock, so
+    # other users' writes only wait for the final INSERT ... SELECT
     conn = get_connection()
-    cursor = conn.cursor()
     
-    now = datetime.now().isoformat()
+    if update_id is not None and conn.execute(
+        "SELECT 1 FROM processed_updates WHERE update_id = ?", (update_id,)
+    ).fetchone():
+        raise DuplicateUpdate(update_id)
+    
+    zone = get_user_timezone(user_id)
+    balance = get_savings_balance(user_id)
     
-    # Check if note exists
-    cursor.execute("SELECT id FROM notes WHERE title = ?", (title,))
-    existing = cursor.fetchone()
+    conn.execute("DROP TABLE IF EXISTS temp.import_rows")
+    conn.execute(
+        "CREATE TEMP TABLE import_rows (kind TEXT, created_at INTEGER, amount INTEGER, description TEXT, day TEXT)"
+    )
     
-    if existing:
-        cursor.execute(
-            "UPDATE notes SET content = ?, updated_at = ? WHERE title = ?",
-            (content, now, title)
+    try:
+        expense_count, savings_count, delta, low, high = _stage_import(
+            conn, _without_overdrafts(rows, balance, reject), zone, progress
         )
-        message = f"Catatan '{title}' berhasil diperbarui"
+        
+        with transaction() as conn:
+            if update_id is not None:
+                _mark_processed(conn, update_id)
+            
+            # Rows were checked against the balance read before parsing; a
+            # withdrawal made meanwhile could now overdraw
+            current = get_savings_balance(user_id)
+            if current + low < 0 or current + high > MAX_BALANCE:
+                raise ValueError("saldo tabungan berubah selama impor, silakan ulangi")
+            
+            if expense_count:
+                conn.execute(
+                    """
+                    INSERT INTO expenses (user_id, amount, description, created_at)
+                    SELECT ?, amount, description, created_at FROM temp.import_rows
+                    WHERE kind = 'expense' ORDER BY rowid
+                    """,
+                    (user_id,)
+                )
+                # Same upsert as _add_expense, pre-aggregated per day
+                conn.execute(
+                    """
+                    INSERT INTO expense_daily_rollup (user_id, day, total, count)
+                    SELECT ?, day, SUM(amount), COUNT(*) FROM temp.import_rows
+                    WHERE kind = 'expense' GROUP BY day
+                    ON CONFLICT(user_id, day) DO UPDATE SET
+                        total = total + excluded.total, count = count + excluded.count
+                    """,
+                    (user_id,)
+                )
+            
+            if savings_count:
+                conn.execute(
+                    """
+                    INSERT INTO savings (user_id, amount, transaction_type, created_at)
+                    SELECT ?, CASE kind WHEN 'deposit' THEN amount ELSE -amount END, kind, created_at
+                    FROM temp.import_rows WHERE kind != 'expense' ORDER BY rowid
+                    """,
+                    (user_id,)
+                )
+                conn.execute(
+                    """
+                    INSERT INTO savings_balance (user_id, balance) VALUES (?, ?)
+                    ON CONFLICT(user_id) DO UPDATE SET balance = balance + excluded.balance
+                    """,
+                    (user_id, delta)
+                )
+    finally:
+        conn.execute("DROP TABLE IF EXISTS temp.import_rows")
+    
+    return expense_count, savings_count
+
+
+def _stage_import(
+    conn: sqlite3.Connection,
+    rows: Iterator[Tuple[str, int, int, str]],
+    zone: str,
+    progress: Optional[Callable[[int], None]],
+) -> Tuple[int, int, int, int, int]:
+    """Copy rows into temp.import_rows, returns (expenses, savings, balance delta, lowest and highest running delta)"""
+    # Rows are consumed a chunk at a time, so memory stays flat however long
+    # the input is
+    expense_count = savings_count = delta = low = high = 0
+    
+    conn.execute("BEGIN")
+    try:
+        while True:
+            chunk = list(itertools.islice(rows, IMPORT_CHUNK_SIZE))
+            if not chunk:
+                break
+            
+            conn.executemany(
+                "INSERT INTO temp.import_rows (kind, created_at, amount, description, day) VALUES (?, ?, ?, ?, ?)",
+                [
+                    (kind, created_at, amount, description, local_day(created_at, zone) if kind == "expense" else None)
+                    for kind, created_at, amount, description in chunk
+                ]
+            )
+            
+            for kind, _, amount, _ in chunk:
+                if kind == "expense":
+                    expense_count += 1
+                    continue
+                savings_count += 1
+                delta += amount if kind == "deposit" else -amount
+                low, high = min(low, delta), max(high, delta)
+            
+            if progress is not None:
+                progress(expense_count + savings_count)
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
     else:
-        cursor.execute(
-            "INSERT INTO notes (title, content, created_at, updated_at) VALUES (?, ?, ?, ?)",
-            (title, content, now, now)
-        )
-        message = f"Catatan '{title}' berhasil disimpan"
+        conn.execute("COMMIT")
     
-    conn.commit()
-    conn.close()
+    return expense_count, savings_count, delta, low, high
+
+
+# ==================== EXPORT ====================
+
+# Exportable tables: (columns, date column used for ranges and ordering)
+EXPORTS = {
+    "expenses": ("created_at, amount, description", "created_at"),
+    "savings": ("created_at, amount, transaction_type", "created_at"),
+    "notes": ("title, content, created_at, updated_at", "updated_at"),
+}
+
+
+def _stream(cursor: sqlite3.Cursor) -> Iterator[sqlite3.Row]:
+    """Yield raw rows from an open cursor, without copying them into dicts"""
+    try:
+        yield from cursor
+    finally:
+        cursor.close()
+
+
+@track_query
+def iter_export(
+    user_id: int,
+    table: str,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+) -> Tuple[List[str], Iterator[sqlite3.Row]]:
+    """Stream a user's rows of one table oldest first, returns (column names, rows)"""
+    columns, date_column = EXPORTS[table]
+    predicate, params = "", (user_id,)
     
-    return True, message
+    if start_date is not None and end_date is not None:
+        predicate = f"AND {date_column} >= ? AND {date_column} <= ?"
+        params += (to_epoch(start_date), to_epoch(end_date))
+    
+    # Walks the per-user (user_id, date, ...) index, so no sort is needed
+    cursor = get_connection().execute(
+        f"SELECT {columns} FROM {table} WHERE user_id = ? {predicate} ORDER BY {date_column}",
+        params
+    )
+    
+    return [column[0] for column in cursor.description], _stream(cursor)
 
 
-def get_all_notes() -> List[dict]:
-    """Get all notes (title only)"""
+# ==================== NOTES ====================
+
+# Minimum trigram similarity for a title to be suggested
+SUGGESTION_THRESHOLD = 0.2
+
+# Notes change rarely, so reads are served from memory; writes invalidate
+NOTES_CACHE_SIZE = int(os.environ.get("NOTES_CACHE_SIZE", 1024))
+NOTES_CACHE_TTL = float(os.environ.get("NOTES_CACHE_TTL_SECONDS", 300))
+
+notes_cache = LRUCache("notes", NOTES_CACHE_SIZE, NOTES_CACHE_TTL)
+
+
+def _trigrams(title: str) -> set:
+    """Trigrams of a title, padded so short titles and word edges count"""
+    padded = f"  {title.lower()} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _fts_query(user_id: int, text: str) -> str:
+    """Quote user input as FTS5 prefix terms, so its syntax can't break the query"""
+    terms = ['"' + term.replace('"', '""') + '"*' for term in text.split()]
+    if not terms:
+        return ""
+    
+    # The owner token narrows the match to this user's notes before ranking
+    return f'owner:"u{user_id}" AND {{title content}}:({" ".join(terms)})'
+
+
+def _bump_notes_version(conn: sqlite3.Connection) -> int:
+    """Advance the notes version other workers check their cache against"""
+    row = conn.execute(
+        """
+        INSERT INTO meta (key, value) VALUES ('notes_version', 1)
+        ON CONFLICT(key) DO UPDATE SET value = value + 1
+        RETURNING value
+        """
+    ).fetchone()
+    
+    return int(row["value"])
+
+
+def _check_notes_cache():
+    """Drop cached notes if another connection may have changed them"""
     conn = get_connection()
-    cursor = conn.cursor()
     
-    cursor.execute("SELECT id, title, created_at, updated_at FROM notes ORDER BY updated_at DESC")
+    # data_version only moves when another connection commits, so the
+    # version row is read only after someone else wrote something
+    data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+    if getattr(_local, "data_version", None) == data_version:
+        return
+    _local.data_version = data_version
     
-    rows = cursor.fetchall()
-    conn.close()
+    row = conn.execute("SELECT value FROM meta WHERE key = 'notes_version'").fetchone()
+    notes_cache.observe_version(int(row["value"]) if row else 0)
+
+
+def cached_notes(user_id: int, key: tuple, load: Callable):
+    """Serve a read of a user's notes from the cache, calling load() on a miss"""
+    _check_notes_cache()
+    return notes_cache.get_or_load((user_id,) + key, load)
+
+
+@track_query
+def save_note(user_id: int, title: str, content: str) -> Tuple[bool, str]:
+    """Save or update a note"""
+    now = now_epoch()
+    
+    with transaction() as conn:
+        # Check if note exists
+        cursor = conn.execute(
+            "SELECT id FROM notes WHERE user_id = ? AND title = ?",
+            (user_id, title)
+        )
+        existing = cursor.fetchone()
+        
+        if existing:
+            conn.execute(
+                "UPDATE notes SET content = ?, updated_at = ? WHERE id = ?",
+                (content, now, existing["id"])
+            )
+            message = f"Catatan '{title}' berhasil diperbarui"
+        else:
+            cursor = conn.execute(
+                "INSERT INTO notes (user_id, title, content, created_at, updated_at) VALUES (?, ?, ?, ?, ?)",
+                (user_id, title, content, now, now)
+            )
+            conn.executemany(
+                "INSERT OR IGNORE INTO note_trigrams (user_id, trigram, note_id) VALUES (?, ?, ?)",
+                [(user_id, trigram, cursor.lastrowid) for trigram in _trigrams(title)]
+            )
+            message = f"Catatan '{title}' berhasil disimpan"
+        
+        version = _bump_notes_version(conn)
     
-    return [dict(row) for row in rows]
+    notes_cache.invalidate(user_id, version)
+    
+    return True, message
 
 
-def get_note_by_title(title: str) -> Optional[dict]:
-    """Get a specific note by title"""
-    conn = get_connection()
-    cursor = conn.cursor()
+def _get_all_notes(user_id: int) -> List[dict]:
+    cursor = get_connection().execute(
+        "SELECT id, title, created_at, updated_at FROM notes WHERE user_id = ? ORDER BY updated_at DESC",
+        (user_id,)
+    )
     
-    cursor.execute("SELECT * FROM notes WHERE title = ?", (title,))
+    return [dict(row) for row in cursor.fetchall()]
+
+
+@track_query
+def get_all_notes(user_id: int) -> List[dict]:
+    """Get all notes (title only)"""
+    return cached_notes(user_id, ("all",), lambda: _get_all_notes(user_id))
+
+
+@track_query
+def iter_notes(user_id: int, cursor: Optional[Tuple[int, int]] = None, reverse: bool = False) -> Iterator[dict]:
+    """Stream notes (title only) most recently updated first, after an (updated_at, id) cursor"""
+    predicate, order_by, params = _keyset("updated_at, id", cursor, reverse)
     
+    rows = get_connection().execute(
+        f"SELECT id, title, updated_at FROM notes WHERE user_id = ? {predicate} ORDER BY {order_by}",
+        (user_id,) + params
+    )
+    
+    return _iter_rows(rows)
+
+
+def _get_note_by_title(user_id: int, title: str) -> Optional[dict]:
+    cursor = get_connection().execute(
+        "SELECT * FROM notes WHERE user_id = ? AND title = ?",
+        (user_id, title)
+    )
     row = cursor.fetchone()
-    conn.close()
     
     return dict(row) if row else None
 
 
-def delete_note(title: str) -> Tuple[bool, str]:
+@track_query
+def get_note_by_title(user_id: int, title: str) -> Optional[dict]:
+    """Get a specific note by title"""
+    return cached_notes(user_id, ("title", title), lambda: _get_note_by_title(user_id, title))
+
+
+@track_query
+def delete_note(user_id: int, title: str) -> Tuple[bool, str]:
     """Delete a note by title"""
-    conn = get_connection()
-    cursor = conn.cursor()
-    
-    cursor.execute("SELECT id FROM notes WHERE title = ?", (title,))
-    existing = cursor.fetchone()
+    with transaction() as conn:
+        conn.execute(
+            """
+            DELETE FROM note_trigrams
+            WHERE note_id IN (SELECT id FROM notes WHERE user_id = ? AND title = ?)
+            """,
+            (user_id, title)
+        )
+        cursor = conn.execute(
+            "DELETE FROM notes WHERE user_id = ? AND title = ?",
+            (user_id, title)
+        )
+        deleted = cursor.rowcount
+        
+        if deleted:
+            version = _bump_notes_version(conn)
     
-    if not existing:
-        conn.close()
+    if not deleted:
         return False, f"Catatan '{title}' tidak ditemukan"
     
-    cursor.execute("DELETE FROM notes WHERE title = ?", (title,))
-    
-    conn.commit()
-    conn.close()
+    notes_cache.invalidate(user_id, version)
     
     return True, f"Catatan '{title}' berhasil dihapus"
+
+
+@track_query
+def search_notes(user_id: int, query: str, limit: int = 10) -> List[dict]:
+    """Full-text search over note titles and content, best matches first"""
+    match = _fts_query(user_id, query)
+    if not match:
+        return []
+    
+    # Title hits weigh more than content hits
+    cursor = get_connection().execute(
+        """
+        SELECT notes.id, notes.title, notes.updated_at
+        FROM notes_fts
+        JOIN notes ON notes.id = notes_fts.rowid
+        WHERE notes_fts MATCH ? AND notes.user_id = ?
+        ORDER BY bm25(notes_fts, 10.0, 1.0, 0.0)
+        LIMIT ?
+        """,
+        (match, user_id, limit)
+    )
+    
+    return [dict(row) for row in cursor.fetchall()]
+
+
+@track_query
+def suggest_note_titles(user_id: int, title: str, limit: int = 3) -> List[str]:
+    """Titles most similar to a title that wasn't found, by trigram overlap"""
+    trigrams = _trigrams(title)
+    placeholders = ", ".join("?" * len(trigrams))
+    
+    cursor = get_connection().execute(
+        f"""
+        SELECT notes.title, COUNT(*) AS shared
+        FROM note_trigrams
+        JOIN notes ON notes.id = note_trigrams.note_id
+        WHERE note_trigrams.user_id = ? AND note_trigrams.trigram IN ({placeholders})
+        GROUP BY note_trigrams.note_id
+        """,
+        (user_id, *trigrams)
+    )
+    
+    scored = []
+    for row in cursor:
+        # Jaccard similarity of the two trigram sets
+        score = row["shared"] / (len(trigrams) + len(_trigrams(row["title"])) - row["shared"])
+        if score >= SUGGESTION_THRESHOLD:
+            scored.append((score, row["title"]))
+    
+    scored.sort(reverse=True)
+    return [title for _, title in scored[:limit]]
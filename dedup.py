@@ -0,0 +1,34 @@
+"""
+In-memory front for update_id deduplication
+Catches Telegram's webhook retries before any parsing; the processed_updates
+table stays authoritative across workers and restarts
+"""
+
+import threading
+from collections import OrderedDict
+
+
+class RecentUpdates:
+    """Bounded LRU set of recently received update_ids"""
+    
+    def __init__(self, size: int):
+        self._size = size
+        self._ids: "OrderedDict[int, None]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def seen(self, update_id: int) -> bool:
+        """Record an update_id, True if it was already recorded"""
+        with self._lock:
+            if update_id in self._ids:
+                self._ids.move_to_end(update_id)
+                return True
+            
+            self._ids[update_id] = None
+            if len(self._ids) > self._size:
+                self._ids.popitem(last=False)
+            return False
+    
+    def forget(self, update_id: int):
+        """Drop an update_id that wasn't accepted, so Telegram's retry gets through"""
+        with self._lock:
+            self._ids.pop(update_id, None)
@@ -1 +1,75 @@
-# Features module
+"""
+Registry of the bot's feature commands
+Handler modules are imported on first use, keeping cold start short
+"""
+
+import importlib
+from typing import Callable, List, NamedTuple
+
+
+class Feature(NamedTuple):
+    command: str
+    # "module:function" within this package
+    handler: str
+    description: str
+    admin: bool = False
+
+
+class Callback(NamedTuple):
+    name: str
+    pattern: str
+    handler: str
+
+
+FEATURES: List[Feature] = [
+    Feature("tabung", "savings:handle_tabung", "Menabung"),
+    Feature("ambil", "savings:handle_ambil", "Ambil tabungan"),
+    Feature("saldo", "savings:handle_saldo", "Cek saldo"),
+    Feature("rekonsiliasi", "savings:handle_rekonsiliasi", "Cocokkan saldo"),
+    Feature("keluar", "expenses:handle_keluar", "Catat pengeluaran"),
+    Feature("laporan", "expenses:handle_laporan", "Laporan minggu ini"),
+    Feature("laporan_bulan", "expenses:handle_laporan_bulan", "Laporan bulan ini"),
+    Feature("note", "notes:handle_note", "Simpan catatan"),
+    Feature("edit", "notes:handle_edit", "Ubah catatan"),
+    Feature("notes", "notes:handle_notes", "Daftar catatan"),
+    Feature("lihat", "notes:handle_lihat", "Lihat catatan"),
+    Feature("cari", "notes:handle_cari", "Cari catatan"),
+    Feature("import", "imports:handle_import", "Impor CSV"),
+    Feature("export", "exports:handle_export", "Ekspor data"),
+    Feature("hapus_note", "notes:handle_hapus_note", "Hapus catatan"),
+    Feature("zona", "settings:handle_zona", "Atur zona waktu"),
+    Feature("izinkan", "users:handle_izinkan", "Beri akses (admin)", admin=True),
+    Feature("cabut", "users:handle_cabut", "Cabut akses (admin)", admin=True),
+    Feature("pengguna", "users:handle_pengguna", "Daftar pengguna (admin)", admin=True),
+]
+
+# Inline keyboard callbacks, matched on callback_data
+CALLBACKS: List[Callback] = [
+    Callback("laporan_page", r"^(exp|sum)\|", "expenses:handle_laporan_page"),
+    Callback("notes_page", r"^notes\|", "notes:handle_notes_page"),
+]
+
+
+# Documents sent with a command in their caption, matched on the caption
+DOCUMENTS: List[Callback] = [
+    Callback("import", r"^/import(@\w+)?(\s|$)", "imports:handle_import"),
+]
+
+
+def load(handler: str) -> Callable:
+    """Import the module of a "module:function" handler and return the function"""
+    module, name = handler.split(":")
+    return getattr(importlib.import_module(f"{__name__}.{module}"), name)
+
+
+def lazy(handler: str) -> Callable:
+    """Async handler that imports the real one on its first call"""
+    loaded = None
+    
+    async def callback(update, context):
+        nonlocal loaded
+        if loaded is None:
+            loaded = load(handler)
+        return await loaded(update, context)
+    
+    return callback
@@ -3,37 +3,62 @@ Expenses tracking feature handlers
 """
 
 from datetime import datetime, timedelta
+from functools import partial
+import sqlite3
 from telegram import Update
 from telegram.ext import ContextTypes
+from amounts import MAX_AMOUNT, AmountTooLarge, parse_amount, rupiah
+from timezones import format_timestamp, localize, now
+from outbox import reply, edit
 import database as db
+import async_db as adb
+from pagination import (
+    MAX_MESSAGE_LENGTH, NEXT, PREV,
+    fetch_page, render_rows, encode_callback, decode_callback, page_keyboard,
+)
 
+# Callback data prefixes for report navigation
+ITEMS_PAGE = "exp"
+SUMMARY_PAGE = "sum"
 
-def parse_amount(text: str) -> float:
-    """Parse amount from text like '10k', '10rb', '10000'"""
-    text = text.lower().strip()
-    
-    multiplier = 1
-    if text.endswith("k") or text.endswith("rb"):
-        multiplier = 1000
-        text = text.rstrip("krb")
-    elif text.endswith("jt"):
-        multiplier = 1000000
-        text = text.rstrip("jt")
+# Long descriptions are clipped so a single row always fits a page
+MAX_DESCRIPTION_LENGTH = 200
+
+
+def parse_date(text: str) -> datetime:
+    """Parse a date like '17/10/2026' or '2026-10-17'"""
+    for fmt in ("%d/%m/%Y", "%Y-%m-%d"):
+        try:
+            return datetime.strptime(text, fmt)
+        except ValueError:
+            continue
     
-    # Remove any remaining non-numeric except decimal
-    text = text.replace(",", "").replace(".", "")
+    raise ValueError(f"Invalid date: {text}")
+
+
+def parse_month(text: str) -> datetime:
+    """Parse a month like '2026-10' or '10/2026', returns its first day"""
+    for fmt in ("%Y-%m", "%m/%Y"):
+        try:
+            return datetime.strptime(text, fmt)
+        except ValueError:
+            continue
     
-    return float(text) * multiplier
+    raise ValueError(f"Invalid month: {text}")
 
 
 async def handle_keluar(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle /keluar command - record an expense"""
+    user_id = update.effective_user.id
+    
     if len(context.args) < 2:
-        await update.message.reply_text(
+        reply(
+            update,
             "Cara penggunaan: /keluar <jumlah> <keterangan>\n"
             "Contoh: /keluar 10k jajan\n"
             "Contoh: /keluar 50000 makan siang\n\n"
-            "Tips: Bisa pakai 'k' atau 'rb' untuk ribuan, 'jt' untuk jutaan"
+            "Tips: Bisa pakai 'k'/'rb'/'ribu' untuk ribuan, 'jt'/'juta' untuk jutaan,\n"
+            "desimal seperti 1,5jt, dan penjumlahan seperti 10k+5k"
         )
         return
     
@@ -42,101 +67,244 @@ async def handle_keluar(update: Update, context: ContextTypes.DEFAULT_TYPE):
         description = " ".join(context.args[1:])
         
         if amount <= 0:
-            await update.message.reply_text("Jumlah harus lebih dari 0")
+            reply(update, "Jumlah harus lebih dari 0")
             return
         
-        db.add_expense(amount, description)
+        await adb.add_expense(user_id, amount, description, update_id=update.update_id)
+        zone = await adb.get_user_timezone(user_id)
         
-        await update.message.reply_text(
+        reply(
+            update,
             f"Pengeluaran tercatat:\n"
-            f"  Jumlah: Rp {amount:,.0f}\n"
+            f"  Jumlah: {rupiah(amount)}\n"
             f"  Keterangan: {description}\n"
-            f"  Waktu: {datetime.now().strftime('%d/%m/%Y %H:%M')}"
+            f"  Waktu: {now(zone).strftime('%d/%m/%Y %H:%M')}"
         )
-        
+    
+    except db.DuplicateUpdate:
+        # Telegram retry of an update already applied and answered
+        return
+    
+    except sqlite3.OperationalError:
+        reply(update, db.BUSY_MESSAGE)
+    
+    except AmountTooLarge:
+        reply(update, f"Jumlah terlalu besar (maksimal {rupiah(MAX_AMOUNT)}).")
+    
     except ValueError:
-        await update.message.reply_text("Jumlah tidak valid. Contoh: 10k, 50000, 1jt")
+        reply(update, "Jumlah tidak valid. Contoh: 10k, 50000, 1jt")
+
+
+def _day_range(start_date: datetime, end_date: datetime):
+    """Expand two dates to the full days they cover"""
+    start = start_date.replace(hour=0, minute=0, second=0, microsecond=0)
+    end = end_date.replace(hour=23, minute=59, second=59, microsecond=999999)
+    return start, end
+
+
+def render_expense(exp: dict, prev: dict, zone: str) -> str:
+    """Render one expense line, with a date header when the day changes"""
+    text = ""
+    date_str = format_timestamp(exp["created_at"], zone, "%d/%m/%Y")
+    
+    if prev is None or format_timestamp(prev["created_at"], zone, "%d/%m/%Y") != date_str:
+        if prev is not None:
+            text += "\n"
+        text += f"[{date_str}]\n"
+    
+    time_str = format_timestamp(exp["created_at"], zone, "%H:%M")
+    description = exp["description"][:MAX_DESCRIPTION_LENGTH]
+    text += f"  {time_str} - {description}: {rupiah(exp['amount'])}\n"
+    
+    return text
+
+
+def render_day(day: dict, prev: dict) -> str:
+    """Render one day of a summary report"""
+    date_obj = datetime.fromisoformat(day["day"])
+    return (
+        f"[{date_obj.strftime('%d/%m/%Y')}] {day['count']}x - Total: {rupiah(day['total'])} "
+        f"(kumulatif: {rupiah(day['running_total'])})\n"
+    )
+
+
+def build_items_page(user_id: int, start_date: datetime, end_date: datetime, cursor=None, direction=NEXT):
+    """Build one page of the itemized report, returns (text, reply_markup, has_expenses)"""
+    start, end = _day_range(start_date, end_date)
+    report = db.get_expense_report(user_id, start, end)
+    if not report["count"]:
+        return "", None, False
+    
+    render = partial(render_expense, zone=db.get_user_timezone(user_id))
+    
+    header = "LAPORAN PENGELUARAN\n"
+    header += f"Periode: {start.strftime('%d/%m/%Y')} - {end.strftime('%d/%m/%Y')}\n"
+    header += "=" * 35 + "\n\n"
+    footer = "\n" + "=" * 35 + "\n"
+    footer += f"TOTAL: {rupiah(report['total'])}"
+    
+    rows, has_prev, has_next = fetch_page(
+        lambda after, way: db.iter_expenses(user_id, start, end, after, reverse=(way == PREV)),
+        render,
+        MAX_MESSAGE_LENGTH - len(header) - len(footer),
+        cursor,
+        direction,
+    )
+    
+    def nav(way, exp):
+        return encode_callback(
+            ITEMS_PAGE, start.strftime("%Y%m%d"), end.strftime("%Y%m%d"),
+            way, exp["created_at"], exp["id"],
+        )
+    
+    keyboard = page_keyboard(
+        nav(PREV, rows[0]) if rows and has_prev else None,
+        nav(NEXT, rows[-1]) if rows and has_next else None,
+    )
+    
+    return header + render_rows(rows, render) + footer, keyboard, True
+
+
+def build_summary_page(user_id: int, title: str, start_date: datetime, end_date: datetime, cursor=None, direction=NEXT):
+    """Build one page of the per-day summary report, returns (text, reply_markup, has_expenses)"""
+    report = db.get_expense_report(user_id, start_date, end_date)
+    if not report["count"]:
+        return "", None, False
+    
+    header = f"{title}\n"
+    header += f"Periode: {start_date.strftime('%d/%m/%Y')} - {end_date.strftime('%d/%m/%Y')}\n"
+    header += "=" * 35 + "\n\n"
+    footer = "\n" + "=" * 35 + "\n"
+    footer += f"TRANSAKSI: {report['count']}\n"
+    footer += f"TOTAL: {rupiah(report['total'])}"
+    
+    rows, has_prev, has_next = fetch_page(
+        lambda after, way: db.iter_expense_days(user_id, start_date, end_date, after, reverse=(way == PREV)),
+        render_day,
+        MAX_MESSAGE_LENGTH - len(header) - len(footer),
+        cursor,
+        direction,
+    )
+    
+    def nav(way, day):
+        return encode_callback(
+            SUMMARY_PAGE, start_date.strftime("%Y%m%d"), end_date.strftime("%Y%m%d"),
+            way, day["day"],
+        )
+    
+    keyboard = page_keyboard(
+        nav(PREV, rows[0]) if rows and has_prev else None,
+        nav(NEXT, rows[-1]) if rows and has_next else None,
+    )
+    
+    return header + render_rows(rows, render_day) + footer, keyboard, True
 
 
 async def handle_laporan(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Handle /laporan command - weekly expense report"""
-    today = datetime.now()
-    start_of_week = today - timedelta(days=today.weekday())
-    start_of_week = start_of_week.replace(hour=0, minute=0, second=0, microsecond=0)
-    end_of_week = today.replace(hour=23, minute=59, second=59, microsecond=999999)
+    """Handle /laporan command - weekly report, or /laporan <dari> <sampai>"""
+    if context.args:
+        await handle_laporan_range(update, context)
+        return
     
-    expenses = db.get_expenses_by_period(start_of_week, end_of_week)
-    total = db.get_total_expenses_by_period(start_of_week, end_of_week)
+    user_id = update.effective_user.id
+    today = now(await adb.get_user_timezone(user_id))
+    start_of_week, end_of_week = _day_range(today - timedelta(days=today.weekday()), today)
     
-    if not expenses:
-        await update.message.reply_text("Tidak ada pengeluaran minggu ini.")
+    text, keyboard, has_expenses = await adb.run(build_items_page, user_id, start_of_week, end_of_week)
+    
+    if not has_expenses:
+        reply(update, "Tidak ada pengeluaran minggu ini.")
         return
     
-    message = "LAPORAN PENGELUARAN MINGGU INI\n"
-    message += f"Periode: {start_of_week.strftime('%d/%m/%Y')} - {today.strftime('%d/%m/%Y')}\n"
-    message += "=" * 35 + "\n\n"
-    
-    # Group by date
-    expenses_by_date = {}
-    for exp in expenses:
-        date_str = exp["created_at"][:10]
-        if date_str not in expenses_by_date:
-            expenses_by_date[date_str] = []
-        expenses_by_date[date_str].append(exp)
-    
-    for date_str, date_expenses in sorted(expenses_by_date.items(), reverse=True):
-        date_obj = datetime.fromisoformat(date_str)
-        message += f"[{date_obj.strftime('%d/%m/%Y')}]\n"
-        
-        for exp in date_expenses:
-            time_str = exp["created_at"][11:16]
-            message += f"  {time_str} - {exp['description']}: Rp {exp['amount']:,.0f}\n"
-        
-        message += "\n"
+    reply(update, text, reply_markup=keyboard)
+
+
+async def handle_laporan_range(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handle /laporan <dari> <sampai> - expense summary for any date range"""
+    user_id = update.effective_user.id
+    
+    if len(context.args) != 2:
+        reply(
+            update,
+            "Cara penggunaan: /laporan <dari> <sampai>\n"
+            "Contoh: /laporan 01/01/2026 31/12/2026"
+        )
+        return
     
-    message += "=" * 35 + "\n"
-    message += f"TOTAL: Rp {total:,.0f}"
+    zone = await adb.get_user_timezone(user_id)
+    
+    try:
+        start_date = localize(parse_date(context.args[0]), zone)
+        end_date = localize(parse_date(context.args[1]), zone)
+    except ValueError:
+        reply(update, "Tanggal tidak valid. Contoh: 01/10/2026 atau 2026-10-01")
+        return
     
-    await update.message.reply_text(message)
+    if start_date > end_date:
+        start_date, end_date = end_date, start_date
+    
+    text, keyboard, has_expenses = await adb.run(build_summary_page, user_id, "LAPORAN PENGELUARAN", start_date, end_date)
+    
+    if not has_expenses:
+        period = f"{start_date.strftime('%d/%m/%Y')} - {end_date.strftime('%d/%m/%Y')}"
+        reply(update, f"Tidak ada pengeluaran pada {period}.")
+        return
+    
+    reply(update, text, reply_markup=keyboard)
 
 
 async def handle_laporan_bulan(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Handle /laporan_bulan command - monthly expense report"""
-    today = datetime.now()
-    start_of_month = today.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-    end_of_month = today.replace(hour=23, minute=59, second=59, microsecond=999999)
+    """Handle /laporan_bulan command - monthly report, or /laporan_bulan <YYYY-MM>"""
+    user_id = update.effective_user.id
+    
+    zone = await adb.get_user_timezone(user_id)
+    today = now(zone)
+    
+    if context.args:
+        try:
+            start_of_month = localize(parse_month(context.args[0]), zone)
+        except ValueError:
+            reply(update, "Bulan tidak valid. Contoh: /laporan_bulan 2026-10")
+            return
+        title = f"LAPORAN PENGELUARAN {start_of_month.strftime('%B %Y').upper()}"
+        empty = f"Tidak ada pengeluaran pada {start_of_month.strftime('%B %Y')}."
+    else:
+        start_of_month = today.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        title = "LAPORAN PENGELUARAN BULAN INI"
+        empty = "Tidak ada pengeluaran bulan ini."
+    
+    next_month = (start_of_month + timedelta(days=32)).replace(day=1)
+    end_of_month = next_month - timedelta(days=1)
     
-    expenses = db.get_expenses_by_period(start_of_month, end_of_month)
-    total = db.get_total_expenses_by_period(start_of_month, end_of_month)
+    text, keyboard, has_expenses = await adb.run(build_summary_page, user_id, title, start_of_month, end_of_month)
     
-    if not expenses:
-        await update.message.reply_text("Tidak ada pengeluaran bulan ini.")
+    if not has_expenses:
+        reply(update, empty)
         return
     
-    message = "LAPORAN PENGELUARAN BULAN INI\n"
-    message += f"Periode: {start_of_month.strftime('%B %Y')}\n"
-    message += "=" * 35 + "\n\n"
-    
-    # Group by date
-    expenses_by_date = {}
-    for exp in expenses:
-        date_str = exp["created_at"][:10]
-        if date_str not in expenses_by_date:
-            expenses_by_date[date_str] = []
-        expenses_by_date[date_str].append(exp)
-    
-    for date_str, date_expenses in sorted(expenses_by_date.items(), reverse=True):
-        date_obj = datetime.fromisoformat(date_str)
-        daily_total = sum(e["amount"] for e in date_expenses)
-        message += f"[{date_obj.strftime('%d/%m/%Y')}] - Total: Rp {daily_total:,.0f}\n"
-        
-        for exp in date_expenses:
-            time_str = exp["created_at"][11:16]
-            message += f"    {time_str} - {exp['description']}: Rp {exp['amount']:,.0f}\n"
-        
-        message += "\n"
+    reply(update, text, reply_markup=keyboard)
+
+
+async def handle_laporan_page(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handle report navigation buttons - fetch the next or previous page"""
+    user_id = update.effective_user.id
     
-    message += "=" * 35 + "\n"
-    message += f"TOTAL BULAN INI: Rp {total:,.0f}"
+    query = update.callback_query
+    await query.answer()
+    
+    kind, start_str, end_str, direction, *cursor = decode_callback(query.data)
+    zone = await adb.get_user_timezone(user_id)
+    start_date = localize(datetime.strptime(start_str, "%Y%m%d"), zone)
+    end_date = localize(datetime.strptime(end_str, "%Y%m%d"), zone)
+    
+    if kind == ITEMS_PAGE:
+        created_at, expense_id = cursor
+        text, keyboard, has_expenses = await adb.run(build_items_page, user_id, start_date, end_date, (int(created_at), int(expense_id)), direction)
+    else:
+        text, keyboard, has_expenses = await adb.run(build_summary_page, user_id, "LAPORAN PENGELUARAN", start_date, end_date, tuple(cursor), direction)
+    
+    if not has_expenses:
+        edit(update, "Tidak ada pengeluaran pada periode ini.")
+        return
     
-    await update.message.reply_text(message)
+    edit(update, text, reply_markup=keyboard)
@@ -0,0 +1,133 @@
+"""
+Data export feature handlers
+Streams a table from the database into a gzip file sent as a document
+"""
+
+import csv
+import gzip
+import json
+import os
+import tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Optional
+
+from telegram import Update
+from telegram.error import TelegramError
+from telegram.ext import ContextTypes
+from outbox import outbox, reply
+import database as db
+import async_db as adb
+from features.expenses import _day_range, parse_date, parse_month
+from timezones import get_zone, localize
+
+TABLES = {
+    "expenses": "expenses",
+    "pengeluaran": "expenses",
+    "keluar": "expenses",
+    "savings": "savings",
+    "tabungan": "savings",
+    "tabung": "savings",
+    "notes": "notes",
+    "catatan": "notes",
+}
+
+FORMATS = ("csv", "jsonl")
+
+# Epoch columns written as ISO 8601 in the user's zone
+TIMESTAMP_COLUMNS = ("created_at", "updated_at")
+
+USAGE = (
+    "Cara penggunaan: /export <data> [rentang] [format]\n"
+    "Data: pengeluaran, tabungan, atau catatan\n"
+    "Rentang: 01/10/2026 31/10/2026, atau bulan 2026-10\n"
+    "Format: csv (default) atau jsonl\n\n"
+    "Contoh: /export pengeluaran 2026-10\n"
+    "Contoh: /export tabungan jsonl"
+)
+
+
+def write_export(
+    user_id: int,
+    table: str,
+    fmt: str,
+    path: str,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+) -> int:
+    """Stream a table into a gzip file at path, returns the row count"""
+    columns, rows = db.iter_export(user_id, table, start_date, end_date)
+    zone = get_zone(db.get_user_timezone(user_id))
+    timestamps = [i for i, column in enumerate(columns) if column in TIMESTAMP_COLUMNS]
+    count = 0
+    
+    def local(row):
+        row = list(row)
+        for i in timestamps:
+            row[i] = datetime.fromtimestamp(row[i], zone).isoformat()
+        return row
+    
+    with gzip.open(path, "wt", encoding="utf-8", newline="") as f:
+        if fmt == "csv":
+            writer = csv.writer(f)
+            writer.writerow(columns)
+            for row in rows:
+                writer.writerow(local(row))
+                count += 1
+        else:
+            for row in rows:
+                f.write(json.dumps(dict(zip(columns, local(row))), ensure_ascii=False) + "\n")
+                count += 1
+    
+    return count
+
+
+async def handle_export(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handle /export command - send a table as a compressed CSV or JSON Lines file"""
+    user_id = update.effective_user.id
+    
+    if not context.args or context.args[0].lower() not in TABLES:
+        reply(update, USAGE)
+        return
+    
+    table = TABLES[context.args[0].lower()]
+    args = [arg.lower() for arg in context.args[1:]]
+    
+    fmt = "csv"
+    if args and args[-1] in FORMATS:
+        fmt = args.pop()
+    
+    zone = await adb.get_user_timezone(user_id)
+    
+    try:
+        start_date = end_date = None
+        if len(args) == 2:
+            start_date, end_date = _day_range(
+                localize(parse_date(args[0]), zone), localize(parse_date(args[1]), zone)
+            )
+        elif len(args) == 1:
+            start_of_month = localize(parse_month(args[0]), zone)
+            next_month = (start_of_month + timedelta(days=32)).replace(day=1)
+            start_date, end_date = _day_range(start_of_month, next_month - timedelta(days=1))
+        elif args:
+            raise ValueError
+    except ValueError:
+        reply(update, USAGE)
+        return
+    
+    with tempfile.TemporaryDirectory() as directory:
+        filename = f"{table}.{fmt}.gz"
+        path = os.path.join(directory, filename)
+        
+        count = await adb.run(write_export, user_id, table, fmt, path, start_date, end_date)
+        if not count:
+            reply(update, "Tidak ada data untuk diekspor.")
+            return
+        
+        try:
+            await outbox.send(
+                update.effective_chat.id, "send_document",
+                document=Path(path), filename=filename, caption=f"{count} baris",
+            )
+        except TelegramError:
+            reply(update, "Gagal mengirim file ekspor.")
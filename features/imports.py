@@ -0,0 +1,219 @@
+"""
+Bulk CSV import feature handlers
+Parses an uploaded CSV outside the write lock, then applies it in one transaction
+"""
+
+import asyncio
+import csv
+import os
+import sqlite3
+import tempfile
+import time
+from typing import Dict, Iterator, List, Tuple
+
+from telegram import Update
+from telegram.ext import ContextTypes
+from outbox import outbox, reply
+import database as db
+import async_db as adb
+from amounts import parse_amount
+from features.expenses import parse_date
+from timezones import localize, to_epoch
+
+# Bot API bots can only download files up to 20 MB
+MAX_IMPORT_SIZE = 20 * 1024 * 1024
+
+# Errors listed individually in the final report
+MAX_REPORTED_ERRORS = 20
+
+# Minimum seconds between progress edits
+PROGRESS_INTERVAL = 2
+
+# Accepted header names per column
+COLUMNS = {
+    "date": ("tanggal", "tgl", "date"),
+    "amount": ("jumlah", "nominal", "amount"),
+    "description": ("keterangan", "deskripsi", "description"),
+    "kind": ("jenis", "tipe", "type"),
+}
+
+KINDS = {
+    "": "expense",
+    "keluar": "expense",
+    "pengeluaran": "expense",
+    "expense": "expense",
+    "tabung": "deposit",
+    "setor": "deposit",
+    "deposit": "deposit",
+    "ambil": "withdraw",
+    "tarik": "withdraw",
+    "withdraw": "withdraw",
+}
+
+USAGE = (
+    "Kirim file CSV dengan caption /import, atau balas file CSV dengan /import.\n\n"
+    "Kolom: tanggal, jumlah, keterangan, jenis\n"
+    "Jenis: keluar (default), tabung, atau ambil\n"
+    "Contoh baris: 17/10/2026,25k,makan siang,keluar"
+)
+
+
+class CsvImport:
+    """Parses an uploaded CSV into import rows, collecting per-row errors"""
+    
+    def __init__(self, path: str, zone: str):
+        self.path = path
+        # Dates in the file are calendar days in the user's zone
+        self.zone = zone
+        self.errors: List[str] = []
+        self.error_count = 0
+        # Line of the row most recently yielded by rows()
+        self.line = 0
+    
+    def reject(self, row: tuple, message: str):
+        """Record a row refused after parsing, against the line just read"""
+        self._error(self.line, message)
+    
+    def _error(self, line: int, message: str):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(f"Baris {line}: {message}")
+    
+    def _columns(self, header: List[str]) -> Dict[str, int]:
+        names = [name.strip().lower() for name in header]
+        columns = {}
+        
+        for column, aliases in COLUMNS.items():
+            for alias in aliases:
+                if alias in names:
+                    columns[column] = names.index(alias)
+                    break
+        
+        if "date" not in columns or "amount" not in columns:
+            raise ValueError("header harus punya kolom tanggal dan jumlah")
+        
+        return columns
+    
+    def _parse(self, record: List[str], columns: Dict[str, int]) -> Tuple[str, int, int, str]:
+        def field(column):
+            index = columns.get(column)
+            return record[index].strip() if index is not None and index < len(record) else ""
+        
+        kind = KINDS.get(field("kind").lower())
+        if kind is None:
+            raise ValueError(f"jenis tidak dikenal '{field('kind')}'")
+        
+        try:
+            created_at = to_epoch(localize(parse_date(field("date")), self.zone))
+        except ValueError:
+            raise ValueError(f"tanggal tidak valid '{field('date')}'")
+        
+        try:
+            amount = parse_amount(field("amount"))
+        except ValueError:
+            raise ValueError(f"jumlah tidak valid '{field('amount')}'")
+        
+        if amount <= 0:
+            raise ValueError("jumlah harus lebih dari 0")
+        
+        description = field("description")[:200] or "import"
+        return kind, created_at, amount, description
+    
+    def rows(self) -> Iterator[Tuple[str, int, int, str]]:
+        """Yield valid rows one at a time, recording invalid ones"""
+        with open(self.path, newline="", encoding="utf-8-sig") as f:
+            # Bank exports often use semicolons
+            try:
+                dialect = csv.Sniffer().sniff(f.read(4096), delimiters=",;\t")
+            except csv.Error:
+                dialect = csv.excel
+            f.seek(0)
+            
+            reader = csv.reader(f, dialect)
+            columns = self._columns(next(reader, []))
+            
+            for record in reader:
+                if not any(value.strip() for value in record):
+                    continue
+                try:
+                    row = self._parse(record, columns)
+                except ValueError as exc:
+                    self._error(reader.line_num, str(exc))
+                    continue
+                self.line = reader.line_num
+                yield row
+
+
+def render_report(expenses: int, savings: int, parser: CsvImport) -> str:
+    """Summary of a finished import"""
+    message = (
+        "Import selesai.\n"
+        f"  Pengeluaran: {expenses} baris\n"
+        f"  Tabungan: {savings} baris\n"
+        f"  Gagal: {parser.error_count} baris"
+    )
+    
+    if parser.errors:
+        message += "\n\n" + "\n".join(parser.errors)
+        if parser.error_count > len(parser.errors):
+            message += f"\n... dan {parser.error_count - len(parser.errors)} lainnya"
+    
+    return message
+
+
+async def handle_import(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handle /import command - import expenses and savings from a CSV file"""
+    user_id = update.effective_user.id
+    message = update.effective_message
+    
+    document = message.document
+    if document is None and message.reply_to_message:
+        document = message.reply_to_message.document
+    
+    if document is None:
+        reply(update, USAGE)
+        return
+    
+    if document.file_size and document.file_size > MAX_IMPORT_SIZE:
+        reply(update, "File terlalu besar (maksimal 20 MB).")
+        return
+    
+    status = await reply(update, "Mengunduh file...")
+    loop = asyncio.get_running_loop()
+    last_progress = time.monotonic()
+    
+    def set_status(text: str):
+        outbox.send(status.chat_id, "edit_message_text", message_id=status.message_id, text=text)
+    
+    def progress(done: int):
+        # Called from the database thread after each chunk
+        nonlocal last_progress
+        if time.monotonic() - last_progress >= PROGRESS_INTERVAL:
+            last_progress = time.monotonic()
+            loop.call_soon_threadsafe(set_status, f"Mengimpor... {done} baris")
+    
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "import.csv")
+        file = await document.get_file()
+        await file.download_to_drive(path)
+        
+        parser = CsvImport(path, await adb.get_user_timezone(user_id))
+        set_status("Mengimpor...")
+        
+        try:
+            expenses, savings = await adb.run(
+                db.import_transactions, user_id, parser.rows(), update.update_id, progress, parser.reject
+            )
+        except db.DuplicateUpdate:
+            # Telegram retry of an import already applied
+            return
+        except (ValueError, UnicodeDecodeError, csv.Error) as exc:
+            # Nothing was imported, the transaction rolled back
+            set_status(f"Impor gagal: {exc}")
+            return
+        except sqlite3.OperationalError:
+            # Gave up waiting for the write lock, nothing was imported
+            set_status(db.BUSY_MESSAGE)
+            return
+    
+    set_status(render_report(expenses, savings, parser))
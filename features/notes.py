@@ -2,87 +2,201 @@
 Notes feature handlers - for storing passwords and notes
 """
 
+import sqlite3
+
 from telegram import Update
 from telegram.ext import ContextTypes
+from outbox import reply, edit
+from timezones import format_timestamp
 import database as db
+import async_db as adb
+from pagination import (
+    MAX_MESSAGE_LENGTH, NEXT, PREV,
+    fetch_page, render_rows, encode_callback, decode_callback, page_keyboard,
+)
+
+# Callback data prefix for notes navigation
+NOTES_PAGE = "notes"
 
 
 async def handle_note(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle /note command - save a note"""
+    user_id = update.effective_user.id
+    
     if len(context.args) < 2:
-        await update.message.reply_text(
-            "Cara penggunaan: /note <judul> <isi>\n"
-            "Contoh: /note gmail password123\n"
-            "Contoh: /note wifi rumah MyWifiPassword123"
+        reply(
+            update,
+            "Contoh: /note gmail password123"
         )
         return
     
     title = context.args[0].lower()
     content = " ".join(context.args[1:])
     
-    success, message = db.save_note(title, content)
-    await update.message.reply_text(message)
+    try:
+        success, message = await adb.save_note(user_id, title, content)
+    except sqlite3.OperationalError:
+        reply(update, db.BUSY_MESSAGE)
+        return
+    reply(update, message)
+
+
+def render_note(note: dict, prev: dict) -> str:
+    """Render one line of the notes list"""
+    return f"- {note['title']}\n"
+
+
+def build_notes_page(user_id: int, cursor=None, direction=NEXT):
+    """Build one page of the notes list, returns (text, reply_markup, has_notes)"""
+    return db.cached_notes(
+        user_id, ("page", cursor, direction), lambda: _build_notes_page(user_id, cursor, direction)
+    )
+
+
+def _build_notes_page(user_id: int, cursor, direction):
+    header = "CATATAN\n"
+    footer = "\nKetik /lihat [judul] untuk buka"
+    
+    rows, has_prev, has_next = fetch_page(
+        lambda after, way: db.iter_notes(user_id, after, reverse=(way == PREV)),
+        render_note,
+        MAX_MESSAGE_LENGTH - len(header) - len(footer),
+        cursor,
+        direction,
+    )
+    
+    def nav(way, note):
+        return encode_callback(NOTES_PAGE, way, note["updated_at"], note["id"])
+    
+    keyboard = page_keyboard(
+        nav(PREV, rows[0]) if rows and has_prev else None,
+        nav(NEXT, rows[-1]) if rows and has_next else None,
+    )
+    
+    return header + render_rows(rows, render_note) + footer, keyboard, bool(rows)
 
 
 async def handle_notes(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle /notes command - list all notes"""
-    notes = db.get_all_notes()
+    user_id = update.effective_user.id
     
-    if not notes:
-        await update.message.reply_text(
-            "Belum ada catatan tersimpan.\n"
-            "Gunakan /note <judul> <isi> untuk menyimpan."
-        )
+    text, keyboard, has_notes = await adb.run(build_notes_page, user_id)
+    
+    if not has_notes:
+        reply(update, "Belum ada catatan.")
         return
     
-    message = "DAFTAR CATATAN\n"
-    message += "=" * 30 + "\n\n"
+    reply(update, text, reply_markup=keyboard)
+
+
+async def handle_notes_page(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handle notes navigation buttons - fetch the next or previous page"""
+    user_id = update.effective_user.id
     
-    for note in notes:
-        updated = note["updated_at"][:10]
-        message += f"- {note['title']} (update: {updated})\n"
+    query = update.callback_query
+    await query.answer()
     
-    message += "\n" + "=" * 30 + "\n"
-    message += "Ketik /lihat <judul> untuk melihat isi"
+    _, direction, updated_at, note_id = decode_callback(query.data)
+    text, keyboard, _ = await adb.run(build_notes_page, user_id, (int(updated_at), int(note_id)), direction)
     
-    await update.message.reply_text(message)
+    edit(update, text, reply_markup=keyboard)
 
 
 async def handle_lihat(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle /lihat command - view a specific note"""
+    user_id = update.effective_user.id
+    
     if not context.args:
-        await update.message.reply_text(
-            "Cara penggunaan: /lihat <judul>\n"
-            "Contoh: /lihat gmail"
-        )
+        reply(update, "Contoh: /lihat gmail")
         return
     
     title = context.args[0].lower()
-    note = db.get_note_by_title(title)
+    note = await adb.get_note_by_title(user_id, title)
     
     if not note:
-        await update.message.reply_text(f"Catatan '{title}' tidak ditemukan.")
+        message = f"'{title}' tidak ditemukan."
+        suggestions = await adb.suggest_note_titles(user_id, title)
+        if suggestions:
+            message += "\n\nMungkin maksud kamu:\n"
+            message += "\n".join(f"- {suggestion}" for suggestion in suggestions)
+        reply(update, message)
         return
     
-    message = f"CATATAN: {note['title'].upper()}\n"
-    message += "=" * 30 + "\n\n"
+    zone = await adb.get_user_timezone(user_id)
+    
+    message = f"{note['title'].upper()}\n"
     message += f"{note['content']}\n\n"
-    message += "=" * 30 + "\n"
-    message += f"Dibuat: {note['created_at'][:10]}\n"
-    message += f"Update: {note['updated_at'][:10]}"
+    message += f"Update: {format_timestamp(note['updated_at'], zone, '%Y-%m-%d')}"
+    
+    reply(update, message)
+
+
+async def handle_cari(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handle /cari command - search note titles and content"""
+    user_id = update.effective_user.id
     
-    await update.message.reply_text(message)
+    if not context.args:
+        reply(update, "Contoh: /cari email kantor")
+        return
+    
+    query = " ".join(context.args)
+    notes = await adb.search_notes(user_id, query)
+    
+    if not notes:
+        reply(update, f"Tidak ada catatan yang cocok dengan '{query}'.")
+        return
+    
+    message = f"HASIL PENCARIAN '{query}'\n"
+    message += "".join(f"- {note['title']}\n" for note in notes)
+    message += "\nKetik /lihat [judul] untuk buka"
+    
+    reply(update, message)
+
+
+async def handle_edit(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handle /edit command - edit existing note"""
+    user_id = update.effective_user.id
+    
+    if len(context.args) < 2:
+        reply(
+            update,
+            "Contoh: /edit gmail newpassword123"
+        )
+        return
+    
+    title = context.args[0].lower()
+    
+    # Check if note exists
+    existing = await adb.get_note_by_title(user_id, title)
+    if not existing:
+        reply(
+            update,
+            f"'{title}' tidak ditemukan.\n"
+            f"Pakai /note {title} [isi] untuk buat baru."
+        )
+        return
+    
+    content = " ".join(context.args[1:])
+    try:
+        success, message = await adb.save_note(user_id, title, content)
+    except sqlite3.OperationalError:
+        reply(update, db.BUSY_MESSAGE)
+        return
+    reply(update, f"'{title}' berhasil diubah.")
 
 
 async def handle_hapus_note(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle /hapus_note command - delete a note"""
+    user_id = update.effective_user.id
+    
     if not context.args:
-        await update.message.reply_text(
-            "Cara penggunaan: /hapus_note <judul>\n"
-            "Contoh: /hapus_note gmail"
-        )
+        reply(update, "Contoh: /hapus_note gmail")
         return
     
     title = context.args[0].lower()
-    success, message = db.delete_note(title)
-    await update.message.reply_text(message)
+    try:
+        success, message = await adb.delete_note(user_id, title)
+    except sqlite3.OperationalError:
+        reply(update, db.BUSY_MESSAGE)
+        return
+    reply(update, message)
@@ -2,76 +2,137 @@
 Savings feature handlers
 """
 
+import sqlite3
+
 from telegram import Update
 from telegram.ext import ContextTypes
+from amounts import MAX_AMOUNT, AmountTooLarge, parse_amount, rupiah
+from timezones import format_timestamp
+from outbox import reply
 import database as db
+import async_db as adb
 
 
 async def handle_tabung(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle /tabung command - add to savings"""
+    user_id = update.effective_user.id
+    
     if not context.args:
-        await update.message.reply_text(
-            "Cara penggunaan: /tabung <jumlah>\n"
-            "Contoh: /tabung 50000"
+        reply(
+            update,
+            "Contoh: /tabung 50000 atau /tabung 50k"
         )
         return
     
     try:
-        amount = float(context.args[0].replace(",", "").replace(".", ""))
+        amount = parse_amount(context.args[0])
         
         if amount <= 0:
-            await update.message.reply_text("Jumlah harus lebih dari 0")
+            reply(update, "Jumlah harus lebih dari 0")
             return
         
-        new_balance = db.add_savings(amount)
+        new_balance = await adb.add_savings(user_id, amount, update_id=update.update_id)
         
-        await update.message.reply_text(
-            f"Berhasil menabung Rp {amount:,.0f}\n"
-            f"Saldo tabungan sekarang: Rp {new_balance:,.0f}"
+        reply(
+            update,
+            f"Nabung {rupiah(amount)}\n"
+            f"Saldo: {rupiah(new_balance)}"
         )
-        
+    
+    except db.DuplicateUpdate:
+        # Telegram retry of an update already applied and answered
+        return
+    
+    except sqlite3.OperationalError:
+        reply(update, db.BUSY_MESSAGE)
+    
+    except AmountTooLarge:
+        reply(update, f"Jumlah terlalu besar (maksimal {rupiah(MAX_AMOUNT)}).")
+    
     except ValueError:
-        await update.message.reply_text("Jumlah tidak valid. Gunakan angka saja.")
+        reply(update, "Format salah. Contoh: 50000 atau 50k")
 
 
 async def handle_ambil(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle /ambil command - withdraw from savings"""
+    user_id = update.effective_user.id
+    
     if not context.args:
-        await update.message.reply_text(
-            "Cara penggunaan: /ambil <jumlah>\n"
-            "Contoh: /ambil 25000"
+        reply(
+            update,
+            "Contoh: /ambil 25000 atau /ambil 25k"
         )
         return
     
     try:
-        amount = float(context.args[0].replace(",", "").replace(".", ""))
+        amount = parse_amount(context.args[0])
         
         if amount <= 0:
-            await update.message.reply_text("Jumlah harus lebih dari 0")
+            reply(update, "Jumlah harus lebih dari 0")
             return
         
-        success, balance, message = db.withdraw_savings(amount)
-        await update.message.reply_text(message)
-        
+        success, balance, message = await adb.withdraw_savings(user_id, amount, update_id=update.update_id)
+        reply(update, message)
+    
+    except db.DuplicateUpdate:
+        # Telegram retry of an update already applied and answered
+        return
+    
+    except sqlite3.OperationalError:
+        reply(update, db.BUSY_MESSAGE)
+    
+    except AmountTooLarge:
+        reply(update, f"Jumlah terlalu besar (maksimal {rupiah(MAX_AMOUNT)}).")
+    
     except ValueError:
-        await update.message.reply_text("Jumlah tidak valid. Gunakan angka saja.")
+        reply(update, "Format salah. Contoh: 25000 atau 25k")
 
 
 async def handle_saldo(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle /saldo command - check savings balance"""
-    balance = db.get_savings_balance()
+    user_id = update.effective_user.id
+    
+    balance = await adb.get_savings_balance(user_id)
     
     # Get recent history
-    history = db.get_savings_history(5)
+    history = await adb.get_savings_history(user_id, 5)
+    zone = await adb.get_user_timezone(user_id)
     
-    message = f"Saldo tabungan: Rp {balance:,.0f}\n\n"
+    message = f"Saldo tabungan: {rupiah(balance)}\n\n"
     
     if history:
         message += "Transaksi terakhir:\n"
         for tx in history:
             tx_type = "+" if tx["transaction_type"] == "deposit" else "-"
             tx_amount = abs(tx["amount"])
-            tx_date = tx["created_at"][:10]
-            message += f"  {tx_date} | {tx_type}Rp {tx_amount:,.0f}\n"
+            tx_date = format_timestamp(tx["created_at"], zone, "%Y-%m-%d")
+            message += f"  {tx_date} | {tx_type}{rupiah(tx_amount)}\n"
+    
+    reply(update, message)
+
+
+async def handle_rekonsiliasi(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handle /rekonsiliasi command - check stored balance against the ledger"""
+    user_id = update.effective_user.id
+    
+    fix = bool(context.args) and context.args[0].lower() == "perbaiki"
+    
+    try:
+        stored, ledger = await adb.reconcile_savings_balance(user_id, fix=fix)
+    except sqlite3.OperationalError:
+        reply(update, db.BUSY_MESSAGE)
+        return
+    
+    message = (
+        f"Saldo tersimpan: {rupiah(stored)}\n"
+        f"Saldo dari transaksi: {rupiah(ledger)}\n\n"
+    )
+    
+    if stored == ledger:
+        message += "Saldo cocok."
+    elif fix:
+        message += "Saldo tidak cocok, sudah diperbaiki."
+    else:
+        message += "Saldo tidak cocok. Ketik /rekonsiliasi perbaiki untuk memperbaiki."
     
-    await update.message.reply_text(message)
+    reply(update, message)
@@ -0,0 +1,42 @@
+"""
+Per-user settings handlers
+"""
+
+import sqlite3
+
+from telegram import Update
+from telegram.ext import ContextTypes
+from outbox import reply
+import database as db
+import async_db as adb
+from timezones import now, resolve_zone
+
+
+async def handle_zona(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handle /zona command - show or set the user's timezone"""
+    user_id = update.effective_user.id
+    
+    if not context.args:
+        zone = await adb.get_user_timezone(user_id)
+        reply(
+            update,
+            f"Zona waktu: {zone} ({now(zone).strftime('%H:%M')})\n\n"
+            "Ubah dengan /zona <zona>\n"
+            "Contoh: /zona WITA atau /zona Asia/Makassar"
+        )
+        return
+    
+    try:
+        zone = resolve_zone(context.args[0])
+    except ValueError:
+        reply(update, "Zona waktu tidak dikenal. Contoh: WIB, WITA, WIT, atau Asia/Jakarta")
+        return
+    
+    # Also regroups the daily expense report into the new zone
+    try:
+        await adb.set_user_timezone(user_id, zone)
+    except sqlite3.OperationalError:
+        reply(update, db.BUSY_MESSAGE)
+        return
+    
+    reply(update, f"Zona waktu diatur ke {zone} ({now(zone).strftime('%H:%M')}).")
@@ -0,0 +1,86 @@
+"""
+User allowlist management handlers (admin only)
+"""
+
+import sqlite3
+
+from telegram import Update
+from telegram.ext import ContextTypes
+from outbox import reply
+import database as db
+import async_db as adb
+from access import allowlist
+
+
+def parse_user_id(text: str) -> int:
+    """Parse a Telegram user id"""
+    return int(text.strip())
+
+
+async def handle_izinkan(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handle /izinkan command - allow a user"""
+    if not context.args:
+        reply(update, "Contoh: /izinkan 123456789")
+        return
+    
+    try:
+        user_id = parse_user_id(context.args[0])
+    except ValueError:
+        reply(update, "User ID harus angka. Contoh: /izinkan 123456789")
+        return
+    
+    try:
+        added = await adb.allow_user(user_id)
+    except sqlite3.OperationalError:
+        reply(update, db.BUSY_MESSAGE)
+        return
+    await adb.run(allowlist.refresh)
+    
+    if added:
+        reply(update, f"User {user_id} sekarang bisa memakai bot.")
+    else:
+        reply(update, f"User {user_id} sudah diizinkan.")
+
+
+async def handle_cabut(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handle /cabut command - revoke a user"""
+    if not context.args:
+        reply(update, "Contoh: /cabut 123456789")
+        return
+    
+    try:
+        user_id = parse_user_id(context.args[0])
+    except ValueError:
+        reply(update, "User ID harus angka. Contoh: /cabut 123456789")
+        return
+    
+    if user_id == update.effective_user.id:
+        reply(update, "Tidak bisa mencabut akses diri sendiri.")
+        return
+    
+    try:
+        removed = await adb.revoke_user(user_id)
+    except sqlite3.OperationalError:
+        reply(update, db.BUSY_MESSAGE)
+        return
+    await adb.run(allowlist.refresh)
+    
+    if removed:
+        reply(update, f"Akses user {user_id} dicabut.")
+    else:
+        reply(update, f"User {user_id} tidak ada di daftar.")
+
+
+async def handle_pengguna(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handle /pengguna command - list allowed users"""
+    users = await adb.get_allowed_users()
+    
+    if not users:
+        reply(update, "Daftar kosong, bot terbuka untuk semua.")
+        return
+    
+    message = "PENGGUNA\n"
+    for user_id, is_admin in sorted(users.items()):
+        message += f"- {user_id}{' (admin)' if is_admin else ''}\n"
+    
+    reply(update, message)
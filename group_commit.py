@@ -0,0 +1,88 @@
+"""
+Group commit writer for SQLite
+Coalesces writes that arrive within a short window into one transaction
+"""
+
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+
+class GroupCommitWriter:
+    """Single writer thread that commits queued writes in batches"""
+    
+    def __init__(self, transaction: Callable, window: float, max_batch: int):
+        # transaction() must nest as a savepoint inside an open transaction
+        self._transaction = transaction
+        self._window = window
+        self._max_batch = max_batch
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+        self._thread.start()
+    
+    def submit(self, func: Callable, *args, **kwargs) -> Future:
+        """Queue a write, the future resolves with its result after COMMIT"""
+        future = Future()
+        self._queue.put((func, args, kwargs, future))
+        return future
+    
+    def close(self):
+        """Commit everything already queued and stop the writer thread"""
+        self._queue.put(None)
+        self._thread.join()
+    
+    def _run(self):
+        running = True
+        
+        while running:
+            item = self._queue.get()
+            if item is None:
+                break
+            
+            # Collect whatever else arrives within the window
+            batch = [item]
+            deadline = time.monotonic() + self._window
+            while len(batch) < self._max_batch:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if item is None:
+                    running = False
+                    break
+                batch.append(item)
+            
+            self._commit(batch)
+    
+    def _commit(self, batch: list):
+        results = []
+        
+        try:
+            with self._transaction():
+                for func, args, kwargs, future in batch:
+                    # Each write gets a savepoint so one failure can't sink the batch
+                    try:
+                        with self._transaction():
+                            results.append((future, func(*args, **kwargs), None))
+                    except Exception as exc:
+                        results.append((future, None, exc))
+        except Exception as exc:
+            logger.exception("Group commit of %d writes failed", len(batch))
+            for _, _, _, future in batch:
+                future.set_exception(exc)
+            return
+        
+        # Acknowledge only once the whole batch is committed
+        for future, result, exc in results:
+            if exc is not None:
+                future.set_exception(exc)
+            else:
+                future.set_result(result)
@@ -0,0 +1,49 @@
+"""
+Gunicorn configuration for production serving
+Run with: gunicorn -c gunicorn.conf.py app:app
+"""
+
+import os
+import tempfile
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 7860)}"
+
+# Threaded workers, so one slow update doesn't hold up the others
+workers = int(os.environ.get("WEB_CONCURRENCY", 2))
+# Workers split the global outbox rate limit between them
+os.environ.setdefault("OUTBOX_WORKERS", str(workers))
+# Workers write metrics snapshots here, merged by whichever worker is scraped
+os.environ.setdefault("METRICS_DIR", os.path.join(tempfile.gettempdir(), "bot-metrics"))
+worker_class = "gthread"
+threads = int(os.environ.get("GUNICORN_THREADS", 8))
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 60))
+graceful_timeout = 30
+
+accesslog = "-"
+errorlog = "-"
+
+
+def on_starting(server):
+    """Runs once in the master: migrations, allowlist and webhook registration"""
+    import metrics
+    metrics.reset_directory()
+    
+    import app
+    app.bootstrap()
+
+
+def post_fork(server, worker):
+    """Each worker gets its own bot loop and application"""
+    import app
+    app.start_worker()
+
+
+def worker_exit(server, worker):
+    import app
+    app.stop_worker()
+
+
+def child_exit(server, worker):
+    """Keep an exited worker's counters in the merged metrics"""
+    import metrics
+    metrics.mark_process_dead(worker.pid)
@@ -0,0 +1,340 @@
+"""
+Minimal Prometheus metrics, rendered in the text exposition format
+Each worker process keeps its own registry; with METRICS_DIR set, workers
+write snapshots there and a scrape merges them, so any worker can answer
+"""
+
+import bisect
+import functools
+import glob
+import json
+import logging
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from telegram.request import HTTPXRequest
+
+logger = logging.getLogger(__name__)
+
+# Latency buckets in seconds
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Shared snapshot directory for multi-worker deployments, empty for one process
+METRICS_DIR = os.environ.get("METRICS_DIR", "")
+METRICS_FLUSH_SECONDS = float(os.environ.get("METRICS_FLUSH_SECONDS", 5))
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    """Monotonic counter with optional labels"""
+    
+    kind = "counter"
+    
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+    
+    def inc(self, *labels, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+    
+    def snapshot(self) -> list:
+        with self._lock:
+            return [[list(labels), value] for labels, value in self._values.items()]
+    
+    def samples(self, snapshots: Optional[list] = None) -> List[str]:
+        """Sample lines, summing the snapshots of all workers when given"""
+        values: Dict[Tuple[str, ...], float] = {}
+        for snapshot in snapshots if snapshots is not None else [self.snapshot()]:
+            for labels, value in snapshot:
+                values[tuple(labels)] = values.get(tuple(labels), 0) + value
+        return [f"{self.name}{_format_labels(self.labelnames, labels)} {value}" for labels, value in values.items()]
+
+
+class Gauge:
+    """Value that goes up and down, or is read from a callback at scrape time"""
+    
+    kind = "gauge"
+    
+    def __init__(
+        self, name: str, documentation: str, callback: Optional[Callable[[], float]] = None, merge: Callable = sum,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self._callback = callback
+        # Combines the values of live workers, e.g. sum for queue depths
+        self._merge = merge
+        self._value = 0
+        self._lock = threading.Lock()
+    
+    def inc(self, amount: float = 1):
+        with self._lock:
+            self._value += amount
+    
+    def dec(self, amount: float = 1):
+        self.inc(-amount)
+    
+    def set(self, value: float):
+        with self._lock:
+            self._value = value
+    
+    def snapshot(self) -> float:
+        return self._callback() if self._callback is not None else self._value
+    
+    def samples(self, snapshots: Optional[list] = None) -> List[str]:
+        """Sample line, merging the snapshots of live workers when given"""
+        values = snapshots if snapshots is not None else [self.snapshot()]
+        return [f"{self.name} {self._merge(values) if values else 0}"]
+
+
+class Histogram:
+    """Cumulative histogram with optional labels"""
+    
+    kind = "histogram"
+    
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._buckets = tuple(buckets)
+        # labels -> [per-bucket counts..., +Inf count, sum]
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+        self._lock = threading.Lock()
+    
+    def observe(self, value: float, *labels):
+        index = bisect.bisect_left(self._buckets, value)
+        with self._lock:
+            counts = self._values.get(labels)
+            if counts is None:
+                counts = self._values[labels] = [0] * (len(self._buckets) + 2)
+            counts[index] += 1
+            counts[-1] += value
+    
+    def snapshot(self) -> list:
+        with self._lock:
+            return [[list(labels), list(counts)] for labels, counts in self._values.items()]
+    
+    def samples(self, snapshots: Optional[list] = None) -> List[str]:
+        """Sample lines, summing the snapshots of all workers when given"""
+        values: Dict[Tuple[str, ...], List[float]] = {}
+        for snapshot in snapshots if snapshots is not None else [self.snapshot()]:
+            for labels, counts in snapshot:
+                total = values.setdefault(tuple(labels), [0] * len(counts))
+                for i, count in enumerate(counts):
+                    total[i] += count
+        
+        lines = []
+        for labels, counts in values.items():
+            cumulative = 0
+            for bound, count in zip(self._buckets + ("+Inf",), counts):
+                cumulative += count
+                le = f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {counts[-1]}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+class Registry:
+    """Collection of metrics rendered together"""
+    
+    def __init__(self, directory: str = ""):
+        self._metrics = []
+        self._directory = directory
+        self._flusher: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._flush_lock = threading.Lock()
+    
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+    
+    def _path(self) -> str:
+        return os.path.join(self._directory, f"{os.getpid()}.json")
+    
+    def flush(self):
+        """Write this worker's snapshot to the shared directory"""
+        if not self._directory:
+            return
+        
+        snapshot = {metric.name: metric.snapshot() for metric in self._metrics}
+        # Written aside and renamed, so a concurrent scrape never reads half a file
+        tmp = f"{self._path()}.tmp"
+        with self._flush_lock:
+            with open(tmp, "w") as f:
+                json.dump(snapshot, f)
+            os.replace(tmp, self._path())
+    
+    def start_flusher(self):
+        """Flush periodically from a daemon thread, so other workers' scrapes see fresh values"""
+        if not self._directory or self._flusher is not None:
+            return
+        
+        def run():
+            while not self._stop.wait(METRICS_FLUSH_SECONDS):
+                try:
+                    self.flush()
+                except OSError:
+                    logger.exception("Failed to write metrics snapshot")
+        
+        self._stop.clear()
+        self._flusher = threading.Thread(target=run, name="metrics-flush", daemon=True)
+        self._flusher.start()
+    
+    def stop_flusher(self):
+        """Stop the flusher and write a last snapshot"""
+        self._stop.set()
+        if self._flusher is not None:
+            self._flusher.join()
+            self._flusher = None
+        self.flush()
+    
+    def _snapshots(self) -> Dict[str, list]:
+        """Snapshots of every worker per metric; gauges only from live workers"""
+        # Our own file is rewritten first, so a scrape never reports less
+        # than an earlier scrape of this worker did
+        self.flush()
+        
+        gauges = {metric.name for metric in self._metrics if metric.kind == "gauge"}
+        merged: Dict[str, list] = {metric.name: [] for metric in self._metrics}
+        
+        for path in glob.glob(os.path.join(self._directory, "*.json")):
+            dead = os.path.basename(path).startswith("dead-")
+            try:
+                with open(path) as f:
+                    snapshot = json.load(f)
+            except (OSError, ValueError):
+                continue
+            for name, value in snapshot.items():
+                if name in merged and not (dead and name in gauges):
+                    merged[name].append(value)
+        
+        return merged
+    
+    def render(self) -> str:
+        snapshots = self._snapshots() if self._directory else {}
+        
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples(snapshots.get(metric.name)))
+        return "\n".join(lines) + "\n"
+
+
+def reset_directory(directory: str = METRICS_DIR):
+    """Empty the snapshot directory at deployment start, run by the gunicorn master"""
+    if not directory:
+        return
+    
+    os.makedirs(directory, exist_ok=True)
+    for path in glob.glob(os.path.join(directory, "*.json*")):
+        os.remove(path)
+
+
+def mark_process_dead(pid: int, directory: str = METRICS_DIR):
+    """Keep an exited worker's counters in the totals but drop its gauges"""
+    # Removing the file would make every counter drop, which Prometheus reads
+    # as a reset; the timestamp keeps a reused pid from overwriting it
+    path = os.path.join(directory, f"{pid}.json")
+    if directory and os.path.exists(path):
+        os.replace(path, os.path.join(directory, f"dead-{pid}-{time.time_ns()}.json"))
+
+
+registry = Registry(METRICS_DIR)
+
+COMMAND_LATENCY = registry.register(Histogram(
+    "bot_command_duration_seconds", "Handler latency per bot command", ("command",)
+))
+COMMAND_ERRORS = registry.register(Counter(
+    "bot_command_errors_total", "Handler exceptions per bot command", ("command",)
+))
+DB_LATENCY = registry.register(Histogram(
+    "db_query_duration_seconds", "Database call latency per database.py function", ("function",)
+))
+DB_ERRORS = registry.register(Counter(
+    "db_query_errors_total", "Database call exceptions per database.py function", ("function",)
+))
+BOT_API_LATENCY = registry.register(Histogram(
+    "bot_api_request_duration_seconds", "Bot API call latency per method", ("method",)
+))
+BOT_API_ERRORS = registry.register(Counter(
+    "bot_api_errors_total", "Failed Bot API calls per method and status", ("method", "status")
+))
+WEBHOOK_REJECTED = registry.register(Counter(
+    "webhook_rejected_total", "Webhook calls dropped before parsing", ("reason",)
+))
+CACHE_REQUESTS = registry.register(Counter(
+    "cache_requests_total", "Cache lookups per cache and result", ("cache", "result")
+))
+STARTUP_SECONDS = registry.register(Gauge(
+    "bot_startup_seconds", "Seconds from process start until the bot was ready", merge=max
+))
+WEBHOOK_IN_FLIGHT = registry.register(Gauge(
+    "webhook_updates_in_flight", "Webhook updates being processed"
+))
+
+
+def track_command(command: str):
+    """Decorator recording latency and errors of an async command handler"""
+    def decorator(handler):
+        @functools.wraps(handler)
+        async def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await handler(*args, **kwargs)
+            except Exception:
+                COMMAND_ERRORS.inc(command)
+                raise
+            finally:
+                COMMAND_LATENCY.observe(time.perf_counter() - start, command)
+        return wrapper
+    return decorator
+
+
+def track_query(func: Callable) -> Callable:
+    """Decorator recording latency and errors of a database.py function under its name"""
+    # Functions returning iterators are timed up to the first row, not the whole stream
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        except Exception:
+            DB_ERRORS.inc(func.__name__)
+            raise
+        finally:
+            DB_LATENCY.observe(time.perf_counter() - start, func.__name__)
+    return wrapper
+
+
+class InstrumentedRequest(HTTPXRequest):
+    """HTTPXRequest that records Bot API latency and failures per method"""
+    
+    async def do_request(self, url: str, method: str, request_data=None, **kwargs):
+        api_method = url.rsplit("/", 1)[-1]
+        start = time.perf_counter()
+        
+        try:
+            code, payload = await super().do_request(url, method, request_data, **kwargs)
+        except Exception as exc:
+            BOT_API_ERRORS.inc(api_method, type(exc).__name__)
+            raise
+        finally:
+            BOT_API_LATENCY.observe(time.perf_counter() - start, api_method)
+        
+        if code >= 400:
+            BOT_API_ERRORS.inc(api_method, str(code))
+        
+        return code, payload
@@ -0,0 +1,178 @@
+"""
+Outbound message scheduler
+Replies are queued per chat and sent in order, within Telegram's per-chat
+and global flood limits, retrying after RetryAfter and network errors
+"""
+
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from datetime import timedelta
+from typing import Deque, Dict, Optional
+
+from telegram import Bot, Update
+from telegram.error import BadRequest, NetworkError, RetryAfter, TimedOut
+
+from metrics import Gauge, registry
+
+logger = logging.getLogger(__name__)
+
+# Telegram allows about one message per second per chat and 30 per second overall
+PER_CHAT_RATE = float(os.environ.get("OUTBOX_PER_CHAT_RATE", 1))
+PER_CHAT_BURST = float(os.environ.get("OUTBOX_PER_CHAT_BURST", 3))
+# The global limit is shared by every worker process, each taking an equal
+# slice; gunicorn.conf.py sets OUTBOX_WORKERS to the worker count
+OUTBOX_WORKERS = max(1, int(os.environ.get("OUTBOX_WORKERS", 1)))
+GLOBAL_RATE = float(os.environ.get("OUTBOX_GLOBAL_RATE", 30)) / OUTBOX_WORKERS
+GLOBAL_BURST = max(1.0, float(os.environ.get("OUTBOX_GLOBAL_BURST", 30)) / OUTBOX_WORKERS)
+# Per-chat buckets idle this long are full again and can be dropped
+BUCKET_IDLE_SECONDS = float(os.environ.get("OUTBOX_BUCKET_IDLE_SECONDS", 60))
+MAX_RETRIES = int(os.environ.get("OUTBOX_MAX_RETRIES", 3))
+
+
+class TokenBucket:
+    """Token bucket rate limiter for use on one event loop"""
+    
+    def __init__(self, rate: float, capacity: float):
+        self._rate = rate
+        self._capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+    
+    def idle(self, now: float) -> float:
+        """Seconds since the bucket was last used"""
+        return now - self._updated
+    
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self._capacity, self._tokens + (now - self._updated) * self._rate)
+        self._updated = now
+    
+    async def acquire(self):
+        """Wait until a token is available and take it"""
+        while True:
+            self._refill()
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            await asyncio.sleep((1 - self._tokens) / self._rate)
+
+
+class Outbox:
+    """Per-chat ordered, rate-limited queue of Bot API send calls"""
+    
+    def __init__(self, per_chat_rate: float, per_chat_burst: float, global_rate: float, global_burst: float):
+        self._per_chat_rate = per_chat_rate
+        self._per_chat_burst = per_chat_burst
+        self._global = TokenBucket(global_rate, global_burst)
+        self._bot: Optional[Bot] = None
+        self._queues: Dict[int, Deque] = {}
+        self._tasks: Dict[int, asyncio.Task] = {}
+        # Kept across drains, so a chat replied to steadily still hits its limit
+        self._buckets: Dict[int, TokenBucket] = {}
+        self._last_sweep = time.monotonic()
+    
+    def start(self, bot: Bot):
+        """Bind the outbox to the bot that sends the messages"""
+        self._bot = bot
+    
+    def pending(self) -> int:
+        """Number of queued messages across all chats"""
+        return sum(len(queue) for queue in list(self._queues.values()))
+    
+    def send(self, chat_id: int, method: str, **kwargs) -> asyncio.Future:
+        """Queue bot.<method>(chat_id=chat_id, **kwargs), resolves with its result"""
+        future = asyncio.get_running_loop().create_future()
+        future.add_done_callback(_log_failure)
+        
+        self._queues.setdefault(chat_id, deque()).append((method, kwargs, future))
+        if chat_id not in self._tasks:
+            self._tasks[chat_id] = asyncio.create_task(self._drain(chat_id))
+        
+        self._sweep_buckets()
+        return future
+    
+    def _sweep_buckets(self):
+        """Drop per-chat buckets of chats that have gone quiet"""
+        now = time.monotonic()
+        if now - self._last_sweep < BUCKET_IDLE_SECONDS:
+            return
+        self._last_sweep = now
+        
+        for chat_id in [chat_id for chat_id, bucket in self._buckets.items()
+                        if chat_id not in self._tasks and bucket.idle(now) >= BUCKET_IDLE_SECONDS]:
+            del self._buckets[chat_id]
+    
+    async def drain(self):
+        """Wait until every queued message has been sent"""
+        while self._tasks:
+            await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+    
+    async def _drain(self, chat_id: int):
+        queue = self._queues[chat_id]
+        bucket = self._buckets.get(chat_id)
+        if bucket is None:
+            bucket = self._buckets[chat_id] = TokenBucket(self._per_chat_rate, self._per_chat_burst)
+        
+        try:
+            while queue:
+                method, kwargs, future = queue.popleft()
+                await bucket.acquire()
+                await self._send(chat_id, method, kwargs, future)
+        finally:
+            del self._queues[chat_id]
+            del self._tasks[chat_id]
+    
+    async def _send(self, chat_id: int, method: str, kwargs: dict, future: asyncio.Future):
+        error = None
+        
+        for attempt in range(MAX_RETRIES + 1):
+            await self._global.acquire()
+            
+            try:
+                result = await getattr(self._bot, method)(chat_id=chat_id, **kwargs)
+            except RetryAfter as exc:
+                error = exc
+                retry_after = exc.retry_after
+                if isinstance(retry_after, timedelta):
+                    retry_after = retry_after.total_seconds()
+                logger.warning(f"Flood limit hit for chat {chat_id}, retrying in {retry_after}s")
+                await asyncio.sleep(retry_after)
+            except BadRequest as exc:
+                # A subclass of NetworkError, but retrying won't help
+                future.set_exception(exc)
+                return
+            except (TimedOut, NetworkError) as exc:
+                error = exc
+                await asyncio.sleep(2 ** attempt * 0.5)
+            except Exception as exc:
+                future.set_exception(exc)
+                return
+            else:
+                future.set_result(result)
+                return
+        
+        future.set_exception(error)
+
+
+def _log_failure(future: asyncio.Future):
+    if not future.cancelled() and future.exception() is not None:
+        logger.error(f"Failed to send message: {future.exception()}")
+
+
+outbox = Outbox(PER_CHAT_RATE, PER_CHAT_BURST, GLOBAL_RATE, GLOBAL_BURST)
+
+registry.register(Gauge("outbox_pending_messages", "Replies queued in the outbox", outbox.pending))
+
+
+def reply(update: Update, text: str, **kwargs) -> asyncio.Future:
+    """Queue a reply to the chat of an update"""
+    return outbox.send(update.effective_chat.id, "send_message", text=text, **kwargs)
+
+
+def edit(update: Update, text: str, **kwargs) -> asyncio.Future:
+    """Queue an edit of the message a callback query came from"""
+    message = update.callback_query.message
+    return outbox.send(message.chat_id, "edit_message_text", message_id=message.message_id, text=text, **kwargs)
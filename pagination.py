@@ -0,0 +1,94 @@
+"""
+Size-bounded message pages with keyset navigation buttons
+"""
+
+from typing import Callable, Iterable, List, Optional, Tuple
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+
+# Telegram rejects messages longer than this
+MAX_MESSAGE_LENGTH = 4096
+
+# Separator for callback data fields
+SEPARATOR = "|"
+
+NEXT = "n"
+PREV = "p"
+
+
+def take_page(rows: Iterable, render_row: Callable, budget: int) -> Tuple[List, bool]:
+    """Consume rows lazily until the page would exceed budget, returns (rows, has_more)"""
+    # render_row(row, prev_row) returns the text for one row
+    page = []
+    size = 0
+    prev = None
+    
+    for row in rows:
+        chunk = len(render_row(row, prev))
+        if page and size + chunk > budget:
+            return page, True
+        
+        page.append(row)
+        size += chunk
+        prev = row
+    
+    return page, False
+
+
+def render_rows(rows: List, render_row: Callable) -> str:
+    """Render page rows in display order"""
+    text = ""
+    prev = None
+    
+    for row in rows:
+        text += render_row(row, prev)
+        prev = row
+    
+    return text
+
+
+def fetch_page(
+    fetch: Callable,
+    render_row: Callable,
+    budget: int,
+    cursor: Optional[tuple] = None,
+    direction: str = NEXT,
+) -> Tuple[List, bool, bool]:
+    """Fetch one page through a keyset iterator, returns (rows, has_prev, has_next)"""
+    # fetch(cursor, NEXT) yields rows after the cursor in display order,
+    # fetch(cursor, PREV) yields rows before it in reverse display order
+    rows = fetch(cursor, direction)
+    try:
+        page, has_more = take_page(rows, render_row, budget)
+    finally:
+        rows.close()
+    
+    if direction == PREV:
+        page.reverse()
+        return page, has_more, True
+    
+    return page, cursor is not None, has_more
+
+
+def encode_callback(*fields) -> str:
+    """Join callback data fields"""
+    return SEPARATOR.join(str(field) for field in fields)
+
+
+def decode_callback(data: str) -> List[str]:
+    """Split callback data fields"""
+    return data.split(SEPARATOR)
+
+
+def page_keyboard(
+    prev_data: Optional[str],
+    next_data: Optional[str],
+) -> Optional[InlineKeyboardMarkup]:
+    """Build prev/next navigation buttons, None when there is nowhere to go"""
+    buttons = []
+    
+    if prev_data:
+        buttons.append(InlineKeyboardButton("< Sebelumnya", callback_data=prev_data))
+    if next_data:
+        buttons.append(InlineKeyboardButton("Berikutnya >", callback_data=next_data))
+    
+    return InlineKeyboardMarkup([buttons]) if buttons else None
@@ -0,0 +1,66 @@
+"""
+Timezone helpers - timestamps are stored as UTC epoch seconds
+and shown in the user's zone (BOT_TIMEZONE unless set with /zona)
+"""
+
+import os
+import time
+from datetime import datetime
+from functools import lru_cache
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+DEFAULT_TIMEZONE = os.environ.get("BOT_TIMEZONE", "Asia/Jakarta")
+
+# Indonesian zone abbreviations accepted by /zona
+ALIASES = {
+    "wib": "Asia/Jakarta",
+    "wita": "Asia/Makassar",
+    "wit": "Asia/Jayapura",
+}
+
+
+@lru_cache(maxsize=None)
+def get_zone(name: str) -> ZoneInfo:
+    """ZoneInfo for an IANA zone name, raises ValueError if unknown"""
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise ValueError(f"Unknown timezone: {name}")
+
+
+def resolve_zone(text: str) -> str:
+    """Canonical zone name for user input like 'WITA' or 'Asia/Makassar'"""
+    name = ALIASES.get(text.lower(), text)
+    return get_zone(name).key
+
+
+def now_epoch() -> int:
+    """Current time as UTC epoch seconds"""
+    return int(time.time())
+
+
+def now(zone: str) -> datetime:
+    """Current wall-clock time in a zone"""
+    return datetime.now(get_zone(zone))
+
+
+def localize(date: datetime, zone: str) -> datetime:
+    """Attach a zone to a naive wall-clock datetime"""
+    return date.replace(tzinfo=get_zone(zone))
+
+
+def to_epoch(date: datetime) -> int:
+    """UTC epoch seconds of an aware datetime"""
+    return int(date.timestamp())
+
+
+@lru_cache(maxsize=8192)
+def format_timestamp(timestamp: int, zone: str, fmt: str = "%d/%m/%Y %H:%M") -> str:
+    """Format epoch seconds as wall-clock time in a zone"""
+    # Report pages re-render the same rows while paging, so this is cached
+    return datetime.fromtimestamp(timestamp, get_zone(zone)).strftime(fmt)
+
+
+def local_day(timestamp: int, zone: str) -> str:
+    """Calendar day (YYYY-MM-DD) of epoch seconds in a zone"""
+    return format_timestamp(timestamp, zone, "%Y-%m-%d")
@@ -0,0 +1,99 @@
+"""
+Benchmark and randomized property check for amounts.parse_amount
+Formats random amounts in every supported notation and checks they parse back
+
+Usage:
+    python tools/bench_amounts.py --cases 20000 --seed 1
+"""
+
+import argparse
+import os
+import random
+import sys
+import timeit
+from decimal import ROUND_HALF_UP, Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from amounts import parse_amount  # noqa: E402
+
+SUFFIXES = {"k": 1000, "rb": 1000, "ribu": 1000, "jt": 1000000, "juta": 1000000}
+
+SAMPLES = ["50000", "10k", "25rb", "1.5jt", "2,5rb", "Rp 1.500.000", "1,500,000.50", "10k+5k+2,5rb"]
+
+
+def group(integer: int, mark: str) -> str:
+    """Write an integer with a thousands mark"""
+    return f"{integer:,}".replace(",", mark)
+
+
+def notations(rng: random.Random):
+    """Yield (text, expected value) pairs in every notation"""
+    integer = rng.randint(0, 10 ** 9)
+    yield str(integer), Decimal(integer)
+    yield group(integer, "."), Decimal(integer)
+    yield group(integer, ","), Decimal(integer)
+    yield f"Rp {group(integer, '.')}", Decimal(integer)
+    
+    # Decimals that can't be mistaken for a thousands group
+    whole, cents = rng.randint(0, 10 ** 6), rng.randint(0, 99)
+    yield f"{group(whole, '.')},{cents:02d}", Decimal(f"{whole}.{cents:02d}")
+    yield f"{group(whole, ',')}.{cents:02d}", Decimal(f"{whole}.{cents:02d}")
+    
+    suffix = rng.choice(list(SUFFIXES))
+    whole, tenth = rng.randint(1, 999), rng.randint(1, 9)
+    mark = rng.choice(".,")
+    yield f"{whole}{mark}{tenth}{suffix}", Decimal(f"{whole}.{tenth}") * SUFFIXES[suffix]
+    yield f"{whole} {suffix}", Decimal(whole) * SUFFIXES[suffix]
+    
+    terms = [rng.randint(1, 999) for _ in range(rng.randint(2, 4))]
+    yield "+".join(f"{term}k" for term in terms), Decimal(sum(terms) * 1000)
+
+
+def check(cases: int, seed: int) -> int:
+    """Returns the number of mismatches"""
+    rng = random.Random(seed)
+    failures = 0
+    
+    for _ in range(cases):
+        for text, expected in notations(rng):
+            # Bypass the cache so every case exercises the grammar
+            got = parse_amount.__wrapped__(text)
+            if got != int(expected.quantize(Decimal(1), rounding=ROUND_HALF_UP)):
+                failures += 1
+                print(f"MISMATCH {text!r}: got {got}, expected {expected}")
+    
+    for text in ["", "abc", "10k+", "1.5.5", "-5", "10kk", "1.50.000", "1,2,500.5", "99999999999999999999", "1000001jt"]:
+        try:
+            parse_amount.__wrapped__(text)
+        except ValueError:
+            continue
+        failures += 1
+        print(f"ACCEPTED invalid {text!r}")
+    
+    return failures
+
+
+def bench(number: int):
+    for text in SAMPLES:
+        cold = timeit.timeit(lambda: parse_amount.__wrapped__(text), number=number)
+        cached = timeit.timeit(lambda: parse_amount(text), number=number)
+        print(f"{text:<16} {cold / number * 1e6:8.2f} us   cached {cached / number * 1e6:6.2f} us")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark and property check for parse_amount")
+    parser.add_argument("--cases", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--number", type=int, default=100000, help="iterations per benchmark sample")
+    args = parser.parse_args()
+    
+    failures = check(args.cases, args.seed)
+    print(f"{args.cases} cases, {failures} failures")
+    bench(args.number)
+    
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
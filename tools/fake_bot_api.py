@@ -0,0 +1,144 @@
+"""
+Local stand-in for the Telegram Bot API, for load testing
+Answers every Bot API method the bot uses with a canned success response
+
+Usage:
+    python tools/fake_bot_api.py --port 8081 --delay-ms 20
+    BOT_API_BASE_URL=http://127.0.0.1:8081 python app.py
+"""
+
+import argparse
+import json
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+BOT_USER = {
+    "id": 1000000001,
+    "is_bot": True,
+    "first_name": "LoadTestBot",
+    "username": "load_test_bot",
+    "can_join_groups": False,
+    "can_read_all_group_messages": False,
+    "supports_inline_queries": False,
+}
+
+
+# Served for every file download, e.g. documents sent to /import
+SAMPLE_CSV = (
+    "tanggal,jumlah,keterangan,jenis\n"
+    + "".join(f"{day:02d}/09/2026,{day}k,item {day},keluar\n" for day in range(1, 29))
+    + "01/09/2026,500k,gaji,tabung\n"
+    + "02/09/2026,abc,rusak,keluar\n"
+).encode()
+
+
+class FakeBotAPIHandler(BaseHTTPRequestHandler):
+    """Handle /bot<token>/<method> requests"""
+    
+    protocol_version = "HTTP/1.1"
+    delay = 0.0
+    message_id = 0
+    webhook = {"url": "", "has_custom_certificate": False, "pending_update_count": 0}
+    
+    def log_message(self, format, *args):
+        pass
+    
+    def _read_params(self) -> dict:
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length) if length else b""
+        content_type = self.headers.get("Content-Type", "")
+        
+        if not body:
+            return {}
+        if "json" in content_type:
+            return json.loads(body)
+        if "x-www-form-urlencoded" in content_type:
+            return {key: values[0] for key, values in parse_qs(body.decode()).items()}
+        
+        # Multipart uploads (sendDocument) are accepted without parsing
+        return {}
+    
+    def _message(self, params: dict) -> dict:
+        FakeBotAPIHandler.message_id += 1
+        chat_id = int(params.get("chat_id", 0) or 0)
+        return {
+            "message_id": int(params.get("message_id", 0) or 0) or FakeBotAPIHandler.message_id,
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private"},
+            "from": BOT_USER,
+            "text": params.get("text", ""),
+        }
+    
+    def _result(self, method: str, params: dict):
+        method = method.lower()
+        
+        if method == "getme":
+            return BOT_USER
+        if method in ("sendmessage", "editmessagetext", "senddocument"):
+            return self._message(params)
+        if method == "getwebhookinfo":
+            return FakeBotAPIHandler.webhook
+        if method == "setwebhook":
+            FakeBotAPIHandler.webhook = dict(FakeBotAPIHandler.webhook, url=params.get("url", ""))
+            return True
+        if method == "getfile":
+            file_id = params.get("file_id", "")
+            return {
+                "file_id": file_id,
+                "file_unique_id": "x",
+                "file_size": len(SAMPLE_CSV),
+                "file_path": f"documents/{file_id}.csv",
+            }
+        
+        # setMyCommands, answerCallbackQuery, deleteWebhook, ...
+        return True
+    
+    def _file(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(len(SAMPLE_CSV)))
+        self.end_headers()
+        self.wfile.write(SAMPLE_CSV)
+    
+    def do_POST(self):
+        if self.path.startswith("/file/"):
+            self._file()
+            return
+        
+        params = self._read_params()
+        method = self.path.rstrip("/").rsplit("/", 1)[-1]
+        
+        if self.delay:
+            time.sleep(self.delay)
+        
+        body = json.dumps({"ok": True, "result": self._result(method, params)}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    do_GET = do_POST
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake Telegram Bot API server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--delay-ms", type=float, default=0, help="simulated Bot API latency")
+    args = parser.parse_args()
+    
+    FakeBotAPIHandler.delay = args.delay_ms / 1000
+    server = ThreadingHTTPServer((args.host, args.port), FakeBotAPIHandler)
+    server.daemon_threads = True
+    
+    print(f"Fake Bot API listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
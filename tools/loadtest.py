@@ -0,0 +1,272 @@
+"""
+Webhook load generator
+POSTs Telegram Update JSON for every bot command and navigation button to
+/webhook and reports throughput and p50/p95/p99 latency per command
+
+Usage:
+    python tools/fake_bot_api.py &
+    BOT_TOKEN=123:test WEBHOOK_SECRET=test BOT_API_BASE_URL=http://127.0.0.1:8081 \
+        OWNER_ID=1000 ALLOWED_USER_IDS=$(seq -s, 1 16) python app.py &
+    python tools/loadtest.py --url http://127.0.0.1:7860/webhook --concurrency 16 --requests 200 \
+        --secret-token test --users 16 --admin-id 1000
+"""
+
+import argparse
+import http.client
+import itertools
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from typing import Dict, List, Tuple
+from urllib.parse import urlparse
+
+
+def _days() -> Tuple[date, date]:
+    """Start and end of a range within the last 60 days"""
+    end = date.today() - timedelta(days=random.randint(0, 30))
+    return end - timedelta(days=random.randint(0, 30)), end
+
+
+def _date_range() -> str:
+    """Two dates within the last 60 days, e.g. '01/10/2026 17/10/2026'"""
+    start, end = _days()
+    return f"{start:%d/%m/%Y} {end:%d/%m/%Y}"
+
+
+def _outsider() -> str:
+    """User id outside the load senders, so /izinkan and /cabut don't lock them out"""
+    return str(random.randint(10**9, 10**9 + 99))
+
+
+def _month() -> str:
+    """This month or one of the previous two, e.g. '2026-10'"""
+    return f"{date.today().replace(day=1) - timedelta(days=random.randint(0, 2) * 28):%Y-%m}"
+
+
+# Realistic arguments for every registered command
+COMMANDS = {
+    "start": lambda: "",
+    "help": lambda: "",
+    "tabung": lambda: f"{random.randint(1, 500)}k",
+    "ambil": lambda: f"{random.randint(1, 50)}k",
+    "saldo": lambda: "",
+    "rekonsiliasi": lambda: "",
+    "keluar": lambda: f"{random.randint(1, 200)}k {random.choice(['makan', 'bensin', 'kopi', 'parkir'])}",
+    "laporan": lambda: random.choice(["", _date_range()]),
+    "laporan_bulan": lambda: random.choice(["", _month()]),
+    "note": lambda: f"note{random.randint(1, 50)} isi catatan {random.randint(1, 10**6)}",
+    "edit": lambda: f"note{random.randint(1, 50)} isi baru",
+    "notes": lambda: "",
+    "lihat": lambda: f"note{random.randint(1, 50)}",
+    "cari": lambda: random.choice(["note", "secret", "note1"]),
+    "hapus_note": lambda: f"note{random.randint(51, 100)}",
+    "zona": lambda: random.choice(["", "WIB", "WITA", "WIT", "Asia/Jakarta"]),
+    "import": lambda: "",
+    "export": lambda: " ".join(filter(None, [
+        random.choice(["pengeluaran", "tabungan", "catatan"]),
+        random.choice(["", _month(), _date_range()]),
+        random.choice(["", "jsonl"]),
+    ])),
+    "izinkan": _outsider,
+    "cabut": _outsider,
+    "pengguna": lambda: "",
+}
+
+# Sent from --admin-id when given, otherwise admin_only turns them away
+ADMIN_COMMANDS = {"izinkan", "cabut", "pengguna"}
+
+
+def _report_page() -> str:
+    """Report navigation data: itemized (exp) or per-day (sum), cursor at the range start"""
+    start, end = _days()
+    bounds = f"{start:%Y%m%d}|{end:%Y%m%d}"
+    if random.random() < 0.5:
+        return f"exp|{bounds}|n|{int(time.mktime(start.timetuple()))}|0"
+    return f"sum|{bounds}|n|{start:%Y-%m-%d}"
+
+
+# Inline keyboard button presses, callback_data in the bot's encode_callback format
+CALLBACKS = {
+    "laporan_page": _report_page,
+    "notes_page": lambda: f"notes|{random.choice('np')}|{int(time.time()) - random.randint(0, 3600)}|{random.randint(1, 10**6)}",
+}
+
+# Commands sent as a document with the command in its caption
+DOCUMENT_COMMANDS = {"import"}
+
+_update_ids = itertools.count(int(time.time()))
+_local = threading.local()
+
+
+def make_callback_update(name: str, user_id: int) -> dict:
+    """Build a Telegram Update for a button press on an earlier bot message"""
+    update_id = next(_update_ids)
+    
+    return {
+        "update_id": update_id,
+        "callback_query": {
+            "id": str(update_id),
+            "from": {"id": user_id, "is_bot": False, "first_name": "Load"},
+            "chat_instance": str(user_id),
+            "data": CALLBACKS[name](),
+            "message": {
+                "message_id": update_id,
+                "date": int(time.time()),
+                "chat": {"id": user_id, "type": "private", "first_name": "Load"},
+                "text": "LAPORAN",
+            },
+        },
+    }
+
+
+def make_update(command: str, user_id: int) -> dict:
+    """Build a Telegram Update for a command message"""
+    if command in CALLBACKS:
+        return make_callback_update(command, user_id)
+    
+    update_id = next(_update_ids)
+    args = COMMANDS[command]()
+    text = f"/{command} {args}".strip()
+    entities = [{"type": "bot_command", "offset": 0, "length": len(command) + 1}]
+    message = {
+        "message_id": update_id,
+        "date": int(time.time()),
+        "chat": {"id": user_id, "type": "private", "first_name": "Load"},
+        "from": {"id": user_id, "is_bot": False, "first_name": "Load"},
+    }
+    
+    if command in DOCUMENT_COMMANDS:
+        # The fake Bot API serves its sample CSV for any file_id
+        message["document"] = {
+            "file_id": f"load{update_id}",
+            "file_unique_id": f"load{update_id}",
+            "file_name": "import.csv",
+            "mime_type": "text/csv",
+        }
+        message["caption"] = text
+        message["caption_entities"] = entities
+    else:
+        message["text"] = text
+        message["entities"] = entities
+    
+    return {"update_id": update_id, "message": message}
+
+
+def _connection(url) -> http.client.HTTPConnection:
+    """Keep-alive connection per load thread"""
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        cls = http.client.HTTPSConnection if url.scheme == "https" else http.client.HTTPConnection
+        conn = cls(url.hostname, url.port, timeout=30)
+        _local.conn = conn
+    return conn
+
+
+def post_update(url, headers: dict, command: str, user_id: int):
+    """POST one update, returns (command, latency seconds, ok)"""
+    body = json.dumps(make_update(command, user_id)).encode()
+    start = time.perf_counter()
+    
+    try:
+        conn = _connection(url)
+        conn.request("POST", url.path or "/webhook", body=body, headers=headers)
+        response = conn.getresponse()
+        response.read()
+        ok = 200 <= response.status < 300
+    except (OSError, http.client.HTTPException):
+        _local.conn = None
+        ok = False
+    
+    return command, time.perf_counter() - start, ok
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile of sorted samples"""
+    if not samples:
+        return 0.0
+    index = max(0, min(len(samples) - 1, int(round(pct / 100 * len(samples) + 0.5)) - 1))
+    return samples[index]
+
+
+def report(results: List[tuple], elapsed: float):
+    """Print per-command throughput and latency percentiles"""
+    by_command: Dict[str, List[float]] = {}
+    errors: Dict[str, int] = {}
+    
+    for command, latency, ok in results:
+        by_command.setdefault(command, []).append(latency)
+        if not ok:
+            errors[command] = errors.get(command, 0) + 1
+    
+    print(f"{'command':<15}{'count':>7}{'errors':>8}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    for command in sorted(by_command):
+        samples = sorted(by_command[command])
+        print(
+            f"{command:<15}{len(samples):>7}{errors.get(command, 0):>8}"
+            f"{len(samples) / elapsed:>9.1f}"
+            f"{percentile(samples, 50) * 1000:>9.1f}"
+            f"{percentile(samples, 95) * 1000:>9.1f}"
+            f"{percentile(samples, 99) * 1000:>9.1f}"
+        )
+    
+    samples = sorted(latency for _, latency, _ in results)
+    print(
+        f"{'ALL':<15}{len(samples):>7}{sum(errors.values()):>8}"
+        f"{len(samples) / elapsed:>9.1f}"
+        f"{percentile(samples, 50) * 1000:>9.1f}"
+        f"{percentile(samples, 95) * 1000:>9.1f}"
+        f"{percentile(samples, 99) * 1000:>9.1f}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the bot webhook")
+    parser.add_argument("--url", default="http://127.0.0.1:7860/webhook")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=100, help="updates per command")
+    parser.add_argument(
+        "--commands", default=",".join([*COMMANDS, *CALLBACKS]), help="comma separated commands and callbacks"
+    )
+    parser.add_argument("--user-id", type=int, default=1, help="sender id, must be allowed by the bot")
+    parser.add_argument(
+        "--users", type=int, default=1,
+        help="spread updates over this many senders from --user-id up; the outbox paces each chat separately",
+    )
+    parser.add_argument("--admin-id", type=int, default=None, help="sender of admin commands, the bot's OWNER_ID")
+    parser.add_argument("--secret-token", default="", help="X-Telegram-Bot-Api-Secret-Token header, the bot's WEBHOOK_SECRET")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+    
+    random.seed(args.seed)
+    url = urlparse(args.url)
+    headers = {"Content-Type": "application/json"}
+    if args.secret_token:
+        headers["X-Telegram-Bot-Api-Secret-Token"] = args.secret_token
+    
+    commands = [command.strip() for command in args.commands.split(",") if command.strip()]
+    unknown = [command for command in commands if command not in COMMANDS and command not in CALLBACKS]
+    if unknown:
+        parser.error(f"unknown commands: {', '.join(unknown)}")
+    
+    workload = commands * args.requests
+    random.shuffle(workload)
+    
+    def sender(command: str) -> int:
+        if command in ADMIN_COMMANDS and args.admin_id is not None:
+            return args.admin_id
+        return args.user_id + random.randrange(args.users)
+    
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        results = list(executor.map(lambda command: post_update(url, headers, command, sender(command)), workload))
+    elapsed = time.perf_counter() - start
+    
+    print(f"{len(results)} updates in {elapsed:.2f}s at concurrency {args.concurrency}\n")
+    report(results, elapsed)
+
+
+if __name__ == "__main__":
+    main()
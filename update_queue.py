@@ -0,0 +1,79 @@
+"""
+Bounded in-process queue of webhook updates
+Lets /webhook answer Telegram right away; worker tasks on the bot loop
+process the updates, keeping each chat's updates in order
+"""
+
+import asyncio
+import logging
+import threading
+from typing import Awaitable, Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class UpdateQueue:
+    """Updates sharded by chat over a fixed set of worker tasks"""
+    
+    def __init__(self, process: Callable[[object], Awaitable], workers: int, max_size: int):
+        self._process = process
+        self._workers = workers
+        self._max_size = max_size
+        self._pending = 0
+        self._closed = False
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queues: List[asyncio.Queue] = []
+        self._tasks: List[asyncio.Task] = []
+    
+    async def start(self):
+        """Start the worker tasks on the running loop"""
+        self._loop = asyncio.get_running_loop()
+        self._queues = [asyncio.Queue() for _ in range(self._workers)]
+        self._tasks = [asyncio.create_task(self._work(queue)) for queue in self._queues]
+    
+    def pending(self) -> int:
+        """Number of updates queued or being processed"""
+        return self._pending
+    
+    @property
+    def closed(self) -> bool:
+        return self._closed
+    
+    def submit(self, chat_id: int, update) -> bool:
+        """Queue an update from any thread, False when the queue is full or closed"""
+        with self._lock:
+            if self._closed or self._pending >= self._max_size:
+                return False
+            self._pending += 1
+
+            # Same chat, same worker: a chat's updates are processed in order.
+            # Scheduled under the lock so drain() can't overtake it
+            queue = self._queues[chat_id % self._workers]
+            self._loop.call_soon_threadsafe(queue.put_nowait, update)
+
+        return True
+    
+    async def drain(self):
+        """Stop accepting updates and wait for the queued ones to finish"""
+        with self._lock:
+            self._closed = True
+        
+        # Scheduled behind any update still being handed over from another thread
+        for queue in self._queues:
+            self._loop.call_soon(queue.put_nowait, None)
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+    
+    async def _work(self, queue: asyncio.Queue):
+        while True:
+            update = await queue.get()
+            if update is None:
+                return
+            
+            try:
+                await self._process(update)
+            except Exception:
+                logger.exception("Failed to process update")
+            finally:
+                with self._lock:
+                    self._pending -= 1